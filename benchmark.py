@@ -0,0 +1,52 @@
+import argparse
+import glob
+import os
+
+from main import (
+    BASE_DIR,
+    SETTINGS_FILE,
+    Settings,
+    print_report,
+    run_headless,
+    run_synthetic,
+)
+
+# Drop recorded clips here (or point --clips elsewhere)
+CLIP_DIR = os.path.join(BASE_DIR, "benchmarks")
+CLIP_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov")
+
+
+def run_suite(argv=None):
+    parser = argparse.ArgumentParser(description="PhantomCast benchmark suite")
+    parser.add_argument("--clips", default=CLIP_DIR, help="folder of video clips")
+    parser.add_argument("--settings", default=SETTINGS_FILE, help="settings file")
+    parser.add_argument(
+        "--max-frames", type=int, default=0, help="frames per clip (0 = all)"
+    )
+    parser.add_argument(
+        "--synthetic-frames",
+        type=int,
+        default=20000,
+        help="length of the synthetic landmark stream (0 = skip)",
+    )
+    args = parser.parse_args(argv)
+    settings = Settings.load(args.settings)
+
+    clips = sorted(
+        p
+        for p in glob.glob(os.path.join(args.clips, "*"))
+        if p.lower().endswith(CLIP_EXTENSIONS)
+    )
+    if not clips:
+        print(f"No clips found in {args.clips}, skipping video runs")
+    for clip in clips:
+        result = run_headless(clip, settings, args.max_frames)
+        print_report(os.path.basename(clip), *result)
+
+    if args.synthetic_frames:
+        result = run_synthetic(settings, args.synthetic_frames)
+        print_report("synthetic landmarks (logic only)", *result)
+
+
+if __name__ == "__main__":
+    run_suite()
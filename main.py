@@ -1,119 +1,2720 @@
+import time
+
+STARTED_AT = time.perf_counter()  # the startup report counts from here
+
 import cv2
-import tkinter as tk
-from tkinter import ttk, messagebox
 import json
 import os
+import queue
 import threading
-import time
-from PIL import Image, ImageTk
-from pynput.keyboard import Controller, Key
-import math
-import mediapipe as mp
+import multiprocessing
+from multiprocessing import shared_memory
+from types import MappingProxyType
+import numpy as np
+from PIL import Image
+import argparse
+import socket
+import stat
+import string
+import struct
+from collections import deque, namedtuple
+import operator
+
+# Window-only modules, bound by import_ui(). Headless runs, benchmarks and
+# spawned inference workers import this file without a display.
+tk = ttk = messagebox = ImageTk = Controller = None
+
+
+def import_ui():
+    global tk, ttk, messagebox, ImageTk, Controller
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+    from PIL import ImageTk
+    from pynput.keyboard import Controller
+
 
 # --- DYNAMIC PATH SETUP ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SETTINGS_FILE = os.path.join(BASE_DIR, "camwork_settings_v8_5.json")
+# Model files named without a directory are looked up here
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+
+DEFAULT_SETTINGS = {
+    "threshold_mouth": 0.20,
+    "threshold_eye": 0.02,
+    "threshold_left_tilt_left": 20.0,
+    "threshold_left_tilt_right": 20.0,
+    "threshold_right_tilt_left": 20.0,
+    "threshold_right_tilt_right": 20.0,
+    "threshold_left_spread": 0.085,
+    "threshold_right_gas_brake": 0.045,
+    "threshold_rock_sens": 0.05,
+    # Performance
+    "parallel_detectors": True,
+    "inference_process": False,
+    "inference_scale": 1.0,
+    "inference_auto": False,
+    "latency_budget_ms": 25.0,
+    "face_roi": True,
+    "hands_interval": 1,
+    "face_interval": 1,
+    "hud_worker": False,
+    "async_keys": True,
+    "prewarm_models": True,
+    "detector_backend": "auto",
+    "hand_model": "hand_landmarker.task",
+    "face_model": "face_landmarker.task",
+    "tasks_pipelined": False,
+    "event_bus": "",
+    "latency_stats": False,
+    "latency_export": "",
+    "camera_buffer_size": 1,
+    "camera_mjpg": True,
+    "camera_fps": 30,
+    "camera_grab_latest": True,
+    "mirror_landmarks": True,
+    "smooth_features": False,
+    "predict_features": False,
+    "tilt_hysteresis": 2.0,
+    "gap_hysteresis": 0.004,
+    # Key Assignments
+    "key_mouth": "g, end",
+    "key_eye": "g",
+    "key_left_rock": "alt+caps_lock",
+    "key_right_rock": "r",
+    "key_left_spread": "'",
+    "key_left_closed": "tab",
+    "key_left_tilt_l": "ctrl+tab",
+    "key_left_tilt_r": "e",
+    "key_right_forward": "w",
+    "key_right_backward": "s",
+    "key_right_left": "a",
+    "key_right_right": "d",
+}
+
+# Face mesh points the gesture logic reads, in the order they are stored:
+# forehead, chin, upper lip, lower lip, left eyelid top/bottom, right eyelid
+# top/bottom
+FACE_POINTS = (10, 152, 13, 14, 159, 145, 386, 374)
+# Face oval points (forehead, chin, cheeks, temples, jaw) that bound the face
+FACE_OUTLINE_POINTS = (10, 152, 234, 454, 21, 251, 172, 397)
+
+
+# --- LANDMARK MODELS ---
+def load_mediapipe():
+    # Imported on first use: it is the slowest import by far and only the
+    # inference side (possibly another process) needs it
+    import mediapipe
+
+    return mediapipe
+
+
+def build_landmark_models(refine_face=True):
+    # The refinement model sharpens the eye contours; only blinks read them
+    mp = load_mediapipe()
+    hands = mp.solutions.hands.Hands(
+        max_num_hands=2, min_detection_confidence=0.7, min_tracking_confidence=0.7
+    )
+    face = mp.solutions.face_mesh.FaceMesh(refine_landmarks=refine_face)
+    return hands, face
+
+
+def hands_to_array(hand_res):
+    # -> (handedness labels, float32 array of shape (n, 21, 3))
+    if not hand_res.multi_hand_landmarks:
+        return (), np.empty((0, 21, 3), np.float32)
+    sides = tuple(h.classification[0].label for h in hand_res.multi_handedness)
+    lms = np.array(
+        [
+            [(p.x, p.y, p.z) for p in hand.landmark]
+            for hand in hand_res.multi_hand_landmarks
+        ],
+        np.float32,
+    )
+    return sides, lms
+
+
+def reuse_buffer(buffers, name, shape):
+    # The array stored under name, reallocated only when the shape changes
+    buf = buffers.get(name)
+    if buf is None or buf.shape != shape:
+        buf = buffers[name] = np.empty(shape, np.uint8)
+    return buf
+
+
+def to_model_input(frame, scale=1.0, buffers=None):
+    # Landmarks are normalized, so the models can run on a downscaled frame.
+    # buffers: dict owned by the caller whose arrays receive the resized and
+    # RGB images; the result is overwritten by the next call.
+    buffers = {} if buffers is None else buffers
+    if scale < 1.0:
+        h, w = frame.shape[:2]
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        small = reuse_buffer(buffers, "small", (size[1], size[0], 3))
+        frame = cv2.resize(frame, size, dst=small, interpolation=cv2.INTER_AREA)
+    rgb = reuse_buffer(buffers, "rgb", frame.shape)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+
+
+class InferenceScaler:
+    # Picks the model input scale. In auto mode it watches the smoothed
+    # inference time and steps down a size when it stays over the latency
+    # budget, and back up only when the larger size is predicted (by pixel
+    # count) to stay well inside it. Every step is followed by a cool-down,
+    # so it won't oscillate between two sizes.
+    STEPS = (1.0, 0.75, 0.5, 0.375, 0.25)
+
+    def __init__(self, patience=15, headroom=0.8):
+        self.patience = patience
+        self.headroom = headroom
+        self.step = 0
+        self.scale = 1.0
+        self.auto = False
+        self.ema = None
+        self.over = self.under = 0
+
+    def update(self, ms, cfg):
+        self.auto = cfg.inference_auto
+        if not self.auto:
+            self.scale = min(1.0, max(self.STEPS[-1], cfg.inference_scale))
+            self.step, self.ema, self.over, self.under = 0, None, 0, 0
+            return self.scale
+        self.ema = ms if self.ema is None else self.ema + 0.2 * (ms - self.ema)
+        budget = cfg.latency_budget_ms
+        if self.step > 0:
+            growth = (self.STEPS[self.step - 1] / self.STEPS[self.step]) ** 2
+        if self.ema > budget:
+            self.over, self.under = self.over + 1, 0
+            if self.over >= self.patience and self.step < len(self.STEPS) - 1:
+                self._move(1)
+        elif self.step > 0 and self.ema * growth < budget * self.headroom:
+            self.over, self.under = 0, self.under + 1
+            if self.under >= 2 * self.patience:
+                self._move(-1)
+        else:
+            self.over = self.under = 0
+        self.scale = self.STEPS[self.step]
+        return self.scale
+
+    def _move(self, direction):
+        # Start measuring afresh at the new size
+        self.step += direction
+        self.ema = None
+        self.over = self.under = 0
+
+    def summary(self):
+        return f"{self.scale:.2f}" + (" (auto)" if self.auto else "")
+
+
+class FaceRoiTracker:
+    # Runs FaceMesh on a padded crop around the face found in the previous
+    # frame and maps the landmarks back to full-frame normalized coordinates.
+    # Without a previous face, or when the crop loses it, the full frame is
+    # processed instead.
+    def __init__(self, face_mesh, padding=0.35, min_size=0.15):
+        self.mesh = face_mesh
+        self.padding = padding
+        self.min_size = min_size
+        self.enabled = True
+        self.roi = None  # (x0, y0, x1, y1) in pixels of the last frame size
+        self.buffers = {}  # holds the contiguous crop, sized for a full frame
+        self.crop_runs = 0
+        self.full_runs = 0
+
+    def process(self, rgb):
+        h, w = rgb.shape[:2]
+        if self.enabled and self.roi is not None and self.roi[4:] == (w, h):
+            x0, y0, x1, y1 = self.roi[:4]
+            res = self.mesh.process(self._crop(rgb[y0:y1, x0:x1]))
+            if res.multi_face_landmarks:
+                self.crop_runs += 1
+                return self._track(res, w, h, (x0, y0, x1 - x0, y1 - y0))
+        res = self.mesh.process(rgb)
+        self.full_runs += 1
+        if not res.multi_face_landmarks:
+            self.roi = None
+            return None
+        return self._track(res, w, h, (0, 0, w, h))
+
+    def _crop(self, region):
+        # The crop changes size every frame, so it is copied into the front of
+        # one frame-sized buffer instead of a new array
+        buf = reuse_buffer(self.buffers, "crop", (self.roi[5], self.roi[4], 3))
+        crop = buf.reshape(-1)[: region.size].reshape(region.shape)
+        np.copyto(crop, region)
+        return crop
+
+    def _track(self, res, w, h, crop):
+        # Crop-normalized -> full-frame normalized (z scales like x)
+        cx, cy, cw, ch = crop
+        scale = np.array([cw / w, ch / h, cw / w], np.float32)
+        offset = np.array([cx / w, cy / h, 0.0], np.float32)
+        m = res.multi_face_landmarks[0].landmark
+        points = FACE_POINTS + FACE_OUTLINE_POINTS
+        pts = np.array([(m[i].x, m[i].y, m[i].z) for i in points], np.float32)
+        pts = pts * scale + offset
+        if self.enabled:
+            self._update_roi(pts[len(FACE_POINTS) :], w, h)
+        return pts[: len(FACE_POINTS)]
+
+    def _update_roi(self, outline, w, h):
+        x0, y0 = outline[:, 0].min() * w, outline[:, 1].min() * h
+        x1, y1 = outline[:, 0].max() * w, outline[:, 1].max() * h
+        size = max(x1 - x0, y1 - y0, self.min_size * min(w, h))
+        size *= 1 + 2 * self.padding
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        x0, y0 = int(max(0, cx - size / 2)), int(max(0, cy - size / 2))
+        x1, y1 = int(min(w, cx + size / 2)), int(min(h, cy + size / 2))
+        self.roi = (x0, y0, x1, y1, w, h) if x1 > x0 and y1 > y0 else None
+
+    def summary(self):
+        total = self.crop_runs + self.full_runs
+        if not self.enabled or not total:
+            return "off" if not self.enabled else "-"
+        return f"crop {100 * self.crop_runs // total}%"
+
+
+def landmark_detectors(hands, face_tracker):
+    return {
+        "hands": lambda rgb: hands_to_array(hands.process(rgb)),
+        "face": face_tracker.process,
+    }
+
+
+# --- DETECTOR BACKENDS ---
+# A backend owns the landmark models of one stream and exposes them as
+# `detectors`: {"hands": rgb -> (sides, (n, 21, 3) array), "face": rgb ->
+# FACE_POINTS array or None}, plus configure(opts), summary() and close().
+DetectorBackendSpec = namedtuple(
+    "DetectorBackendSpec", "kind hand_model face_model pipelined"
+)
+
+
+def detector_backend_spec(cfg):
+    return DetectorBackendSpec(
+        cfg.detector_backend.strip().lower(),
+        cfg.hand_model,
+        cfg.face_model,
+        cfg.tasks_pipelined,
+    )
+
+
+def model_path(name):
+    return name if os.path.dirname(name) else os.path.join(MODEL_DIR, name)
+
+
+class LegacyBackend:
+    # mp.solutions Hands and FaceMesh, called synchronously, with the face
+    # crop tracker in front of FaceMesh
+    def __init__(self, refine_face=True):
+        self.hands, self.face = build_landmark_models(refine_face)
+        self.face_tracker = FaceRoiTracker(self.face)
+        self.detectors = landmark_detectors(self.hands, self.face_tracker)
+
+    def configure(self, opts):
+        self.face_tracker.enabled = opts["face_roi"]
+
+    def summary(self):
+        return f"face {self.face_tracker.summary()}"
+
+    def close(self):
+        self.hands.close()
+        self.face.close()
+
+
+def tasks_hands_to_array(result):
+    if not result.hand_landmarks:
+        return NO_DETECTION["hands"]
+    sides = tuple(h[0].category_name for h in result.handedness)
+    lms = np.array(
+        [[(p.x, p.y, p.z) for p in hand] for hand in result.hand_landmarks],
+        np.float32,
+    )
+    return sides, lms
+
+
+def tasks_face_to_array(result):
+    if not result.face_landmarks:
+        return None
+    m = result.face_landmarks[0]
+    return np.array([(m[i].x, m[i].y, m[i].z) for i in FACE_POINTS], np.float32)
+
+
+class LiveStreamLandmarker:
+    # One Tasks landmarker in LIVE_STREAM mode. A call submits the frame
+    # without blocking the graph; results come back on MediaPipe's thread.
+    # Pipelined, the call returns the newest finished result (usually the
+    # previous frame's) so the next frame overlaps this one's inference;
+    # otherwise it waits for this frame's result. MediaPipe drops frames it
+    # has no time for, hence the timeout.
+    def __init__(self, create, convert, empty, pipelined=False, timeout=0.2):
+        self.convert = convert
+        self.pipelined = pipelined
+        self.timeout = timeout
+        self.cond = threading.Condition()
+        self.result = empty
+        self.result_ts = -1
+        self.last_ts = -1
+        self.latency_ms = 0.0  # smoothed submit -> callback time
+        self.landmarker = create(self._on_result)
+
+    def _on_result(self, result, image, timestamp_ms):
+        converted = self.convert(result)
+        ms = time.perf_counter() * 1000 - timestamp_ms
+        with self.cond:
+            self.result = converted
+            self.result_ts = timestamp_ms
+            self.latency_ms += 0.1 * (ms - self.latency_ms)
+            self.cond.notify_all()
+
+    def __call__(self, rgb):
+        mp = load_mediapipe()
+        # Timestamps are perf_counter milliseconds, strictly increasing
+        ts = max(self.last_ts + 1, int(time.perf_counter() * 1000))
+        self.last_ts = ts
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
+        self.landmarker.detect_async(image, ts)
+        with self.cond:
+            if not self.pipelined:
+                self.cond.wait_for(lambda: self.result_ts >= ts, self.timeout)
+            return self.result
+
+    def close(self):
+        self.landmarker.close()
+
+
+class TasksBackend:
+    # MediaPipe Tasks HandLandmarker / FaceLandmarker in LIVE_STREAM mode.
+    # FaceLandmarker tracks the face region itself and always outputs the
+    # refined eye points, so there is no crop tracker or refinement switch.
+    def __init__(self, hand_model, face_model, pipelined=False):
+        load_mediapipe()
+        from mediapipe.tasks.python import BaseOptions, vision
+
+        mode = vision.RunningMode.LIVE_STREAM
+        self.pipelined = pipelined
+
+        def hands(callback):
+            options = vision.HandLandmarkerOptions(
+                base_options=BaseOptions(model_asset_path=hand_model),
+                running_mode=mode,
+                num_hands=2,
+                min_hand_detection_confidence=0.7,
+                min_tracking_confidence=0.7,
+                result_callback=callback,
+            )
+            return vision.HandLandmarker.create_from_options(options)
+
+        def face(callback):
+            options = vision.FaceLandmarkerOptions(
+                base_options=BaseOptions(model_asset_path=face_model),
+                running_mode=mode,
+                num_faces=1,
+                result_callback=callback,
+            )
+            return vision.FaceLandmarker.create_from_options(options)
+
+        self.hands = LiveStreamLandmarker(
+            hands, tasks_hands_to_array, NO_DETECTION["hands"], pipelined
+        )
+        try:
+            self.face = LiveStreamLandmarker(face, tasks_face_to_array, None, pipelined)
+        except Exception:
+            self.hands.close()
+            raise
+        self.detectors = {"hands": self.hands, "face": self.face}
+
+    def configure(self, opts):
+        self.pipelined = opts["backend"].pipelined
+        self.hands.pipelined = self.face.pipelined = self.pipelined
+
+    def summary(self):
+        mode = "pipelined" if self.pipelined else "live"
+        return (
+            f"tasks {mode} H {self.hands.latency_ms:.0f}ms"
+            f" F {self.face.latency_ms:.0f}ms"
+        )
+
+    def close(self):
+        self.hands.close()
+        self.face.close()
+
+
+def open_detector_backend(spec=None, refine_face=True):
+    # "auto" takes the Tasks backend when both model files exist, "tasks"
+    # insists on it; if it cannot be built the legacy backend is used
+    if spec is not None and spec.kind in ("auto", "tasks"):
+        hand_path, face_path = model_path(spec.hand_model), model_path(spec.face_model)
+        found = os.path.exists(hand_path) and os.path.exists(face_path)
+        if spec.kind == "tasks" or found:
+            try:
+                return TasksBackend(hand_path, face_path, spec.pipelined)
+            except Exception as e:
+                print(f"MediaPipe Tasks backend unavailable ({e}), using legacy")
+    return LegacyBackend(refine_face)
+
+
+class FramePool:
+    # Preallocated frames shared by capture, inference and the display. Each
+    # frame counts its holders; it is written again only after all of them
+    # released it, so no thread mutates a frame another one is reading.
+    # Frames of another size (or not from the pool) are simply not reused.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.shape = None  # size of the frames being pooled
+        self.free = []
+        self.refs = {}  # id(frame) -> [frame, holders]
+        self.allocated = 0
+
+    def acquire(self, shape=None):
+        # -> a frame held once by the caller, or None if the size is unknown
+        # yet (the decoder then allocates and adopt() takes it in)
+        with self.lock:
+            shape = self.shape if shape is None else tuple(shape)
+            if shape is None:
+                return None
+            if shape != self.shape:
+                self.shape, self.free = shape, []
+            if self.free:
+                frame = self.free.pop()
+            else:
+                frame = np.empty(shape, np.uint8)
+                self.allocated += 1
+            self.refs[id(frame)] = [frame, 1]
+            return frame
+
+    def adopt(self, frame, buf):
+        # frame: what a reader returned after being given buf. Normally the
+        # same array; otherwise it replaces buf in the pool.
+        if frame is buf:
+            return frame
+        if buf is not None:
+            self.release(buf)
+        with self.lock:
+            self.shape = frame.shape
+            self.free = [f for f in self.free if f.shape == frame.shape]
+            self.refs[id(frame)] = [frame, 1]
+            self.allocated += 1
+        return frame
+
+    def hold(self, frame):
+        with self.lock:
+            entry = self.refs.get(id(frame))
+            if entry is not None:
+                entry[1] += 1
+
+    def release(self, frame):
+        with self.lock:
+            entry = self.refs.get(id(frame))
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.refs[id(frame)]
+                if frame.shape == self.shape:
+                    self.free.append(frame)
+
+
+class FrameExchange:
+    # Latest-frame slot shared by the capture thread (producer) and the
+    # inference thread (consumer). Every frame gets a sequence number so the
+    # consumer can block until something newer than what it already has.
+    # A published frame is owned by the exchange until it is replaced;
+    # readers that keep using it after the call pass hold=True and give it
+    # back with release().
+    def __init__(self, pool=None):
+        self.pool = FramePool() if pool is None else pool
+        self.cond = threading.Condition()
+        self.frame = None
+        self.seq = 0
+        self.timestamp = 0.0
+        self.taken_seq = 0
+        self.closed = False
+
+        # Frames replaced before the consumer took them
+        self.dropped = 0
+
+    def publish(self, frame, timestamp=None):
+        # Takes over the caller's hold on frame
+        with self.cond:
+            if self.seq > self.taken_seq:
+                self.dropped += 1
+            old, self.frame = self.frame, frame
+            self.seq += 1
+            self.timestamp = time.perf_counter() if timestamp is None else timestamp
+            self.cond.notify_all()
+        if old is not None:
+            self.pool.release(old)
+
+    def latest(self, hold=False):
+        # Non-blocking peek for the display, does not count as consumed
+        with self.cond:
+            if hold and self.frame is not None:
+                self.pool.hold(self.frame)
+            return self.frame, self.seq, self.timestamp
+
+    def wait_newer(self, last_seq, timeout=None, consume=True, hold=False):
+        # consume=False waits like the display does, without counting as taken
+        with self.cond:
+            if not self.cond.wait_for(
+                lambda: self.seq > last_seq or self.closed, timeout
+            ):
+                return None, last_seq, 0.0
+            if self.closed:
+                return None, last_seq, 0.0
+            if consume:
+                self.taken_seq = self.seq
+            if hold:
+                self.pool.hold(self.frame)
+            return self.frame, self.seq, self.timestamp
+
+    def release(self, frame):
+        if frame is not None:
+            self.pool.release(frame)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class DetectorExecutor:
+    # Runs every landmark model on the same frame. In parallel mode each model
+    # keeps its own persistent worker thread (MediaPipe releases the GIL while
+    # the graph runs), so a frame costs roughly the slowest model instead of
+    # the sum of all of them.
+    def __init__(self, models, parallel=True):
+        self.models = models
+        self.parallel = parallel
+        self.workers = {}
+
+        # Smoothed per-model and per-frame cost in milliseconds, plus the
+        # latest raw sample per model
+        self.timings = {name: 0.0 for name in models}
+        self.last_ms = {name: 0.0 for name in models}
+        self.frame_ms = 0.0
+
+    def _worker(self, name, jobs, results):
+        process = self.models[name]
+        while True:
+            rgb = jobs.get()
+            if rgb is None:
+                return
+            start = time.perf_counter()
+            try:
+                res = process(rgb)
+            except Exception as e:
+                res = e
+            results.put((res, (time.perf_counter() - start) * 1000))
+
+    def _start_workers(self):
+        for name in self.models:
+            jobs, results = queue.Queue(maxsize=1), queue.Queue(maxsize=1)
+            t = threading.Thread(
+                target=self._worker, args=(name, jobs, results), daemon=True
+            )
+            t.start()
+            self.workers[name] = (t, jobs, results)
+
+    def run(self, rgb, names=None):
+        # names: the models to run this frame, all of them by default. A
+        # single model runs inline, a thread handoff would only add latency.
+        names = list(self.models) if names is None else names
+        if not names:
+            return {}
+        start = time.perf_counter()
+        out = {}
+        if self.parallel and len(names) > 1:
+            if not self.workers:
+                self._start_workers()
+            for name in names:
+                self.workers[name][1].put(rgb)
+            for name in names:
+                out[name], ms = self.workers[name][2].get()
+                self._track(name, ms)
+            for res in out.values():
+                if isinstance(res, Exception):
+                    raise res
+        else:
+            for name in names:
+                t0 = time.perf_counter()
+                out[name] = self.models[name](rgb)
+                self._track(name, (time.perf_counter() - t0) * 1000)
+        self.frame_ms += 0.1 * ((time.perf_counter() - start) * 1000 - self.frame_ms)
+        return out
+
+    def _track(self, name, ms):
+        self.last_ms[name] = ms
+        self.timings[name] += 0.1 * (ms - self.timings[name])
+
+    def summary(self):
+        parts = [f"{name[0].upper()} {ms:.0f}ms" for name, ms in self.timings.items()]
+        mode = "par" if self.parallel else "ser"
+        return " ".join(parts) + f" | {self.frame_ms:.0f}ms {mode}"
+
+    def close(self):
+        for t, jobs, _ in self.workers.values():
+            jobs.put(None)
+        for t, _, _ in self.workers.values():
+            t.join(timeout=1.0)
+        self.workers = {}
+
+
+class SharedFrameRing:
+    # Fixed number of BGR frame slots in one shared memory block, so frames
+    # cross the process boundary without being pickled
+    def __init__(self, shm, shape, owner):
+        self.shm = shm
+        self.shape = shape
+        self.owner = owner
+        self.frames = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+
+    @classmethod
+    def create(cls, slots, frame_shape):
+        shape = (slots,) + tuple(frame_shape)
+        shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+        return cls(shm, shape, owner=True)
+
+    @classmethod
+    def attach(cls, name, shape):
+        return cls(shared_memory.SharedMemory(name=name), shape, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass  # removed by the resource tracker of a worker that died
+
+
+# What the gesture logic sees from a detector that did not run
+NO_DETECTION = {"hands": ((), np.zeros((0, 21, 3), np.float32)), "face": None}
+
+
+def detector_plan(cfg):
+    # -> {detector: run every N frames} for the detectors the gesture rules
+    # read; a detector no bound rule needs is not run at all
+    return {
+        name: max(1, int(getattr(cfg, f"{name}_interval")))
+        for name in cfg.rules.detectors
+    }
+
+
+class DetectorScheduler:
+    # Picks the detectors due on each frame from a detector_plan and fills in
+    # the rest: the last result of a detector that is between runs, or
+    # NO_DETECTION for one nothing is bound to. Detectors with the same
+    # interval are staggered so they do not land on the same frame.
+    def __init__(self, detectors):
+        self.detectors = detectors
+        self.results = {name: NO_DETECTION[name] for name in detectors.models}
+        self.fresh = set()  # detectors whose held result is still usable
+        self.frame = 0
+        self.counts = {name: 0 for name in detectors.models}
+        self.rates = dict(self.counts)
+        self.window_start = time.perf_counter()
+
+    def run(self, rgb, plan):
+        due = []
+        for i, name in enumerate(self.detectors.models):
+            every = plan.get(name)
+            if every is None:
+                self.results[name] = NO_DETECTION[name]
+                self.fresh.discard(name)
+            elif name not in self.fresh or (self.frame + i) % every == 0:
+                due.append(name)
+        out = self.detectors.run(rgb, due)
+        self.results.update(out)
+        self.fresh.update(out)
+        for name in out:
+            self.counts[name] += 1
+        self.frame += 1
+        self._update_rates()
+        return self.results, due
+
+    def _update_rates(self):
+        now = time.perf_counter()
+        elapsed = now - self.window_start
+        if elapsed >= 1.0:
+            self.rates = {n: c / elapsed for n, c in self.counts.items()}
+            self.counts = dict.fromkeys(self.counts, 0)
+            self.window_start = now
+
+    def summary(self):
+        return " ".join(
+            (
+                f"{name[0].upper()} {rate:.0f}/s"
+                if name in self.fresh
+                else f"{name[0].upper()} off"
+            )
+            for name, rate in self.rates.items()
+        )
+
+
+def pipeline_options(cfg, scale):
+    # Per-frame options for a LandmarkPipeline; plain values so they can be
+    # sent to an inference process with each frame
+    return {
+        "scale": scale,
+        "face_roi": cfg.face_roi,
+        "plan": detector_plan(cfg),
+        "parallel": cfg.parallel_detectors,
+        "refine_face": "eye_gap" in cfg.rules.features,
+        "backend": detector_backend_spec(cfg),
+    }
+
+
+class LandmarkPipeline:
+    # One camera stream's models and per-stream state (face crop, detector
+    # schedule). MediaPipe tracks landmarks from frame to frame, so streams
+    # never share a pipeline. The backend and face refinement are fixed when
+    # it is built.
+    def __init__(self, refine_face=True, parallel=True, backend=None):
+        self.backend = open_detector_backend(backend, refine_face)
+        self.detectors = DetectorExecutor(self.backend.detectors, parallel=parallel)
+        self.scheduler = DetectorScheduler(self.detectors)
+        self.buffers = {}  # model input images, reused frame to frame
+
+    def run(self, frame, ts, opts):
+        # -> (detector results, stage timings in ms)
+        self.backend.configure(opts)
+        self.detectors.parallel = opts["parallel"]
+        start = time.perf_counter()
+        rgb = to_model_input(frame, opts["scale"], self.buffers)
+        converted = time.perf_counter()
+        out, ran = self.scheduler.run(rgb, opts["plan"])
+        timings = {
+            "queue": (start - ts) * 1000,
+            "convert": (converted - start) * 1000,
+            "detect": (time.perf_counter() - converted) * 1000,
+        }
+        for name in ran:
+            timings[name] = self.detectors.last_ms[name]
+        return out, timings
+
+    def warm(self, shape):
+        # One pass of every model over a blank frame, so graph initialisation
+        # is not paid on the first real frame. Detector state is left alone.
+        self.detectors.run(np.zeros(shape, np.uint8))
+
+    def hud(self):
+        return {
+            "Models": f"{self.detectors.summary()} | {self.backend.summary()}",
+            "Rates": self.scheduler.summary(),
+        }
+
+    def close(self):
+        self.detectors.close()
+        self.backend.close()
+
+
+def inference_worker_main(jobs, results):
+    # Entry point of an inference process. Jobs are (station, ring name, ring
+    # shape, slot, seq, timestamp, options); results carry only compact
+    # landmark arrays, HUD lines and per-stage timings in milliseconds. One
+    # process can serve several stations, each with its own pipeline. A job
+    # that fails comes back as (station, slot, error message).
+    pipelines = {}
+    broken = {}  # station -> why its pipeline could not be built
+    rings = {}
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            station, name, shape, slot, seq, ts, opts = job
+            try:
+                ring = rings.get(name)
+                if ring is None:
+                    ring = rings[name] = SharedFrameRing.attach(name, shape)
+                if station in broken:
+                    raise RuntimeError(broken[station])
+                pipe = pipelines.get(station)
+                if pipe is None:
+                    try:
+                        pipe = LandmarkPipeline(
+                            opts["refine_face"], opts["parallel"], opts["backend"]
+                        )
+                    except Exception as e:
+                        broken[station] = f"models failed: {e}"
+                        raise RuntimeError(broken[station])
+                    pipelines[station] = pipe
+                out, timings = pipe.run(ring.frames[slot], ts, opts)
+            except Exception as e:
+                results.put((station, slot, str(e)))
+                continue
+            sides, hand_lms = out["hands"]
+            results.put(
+                (station, slot, seq, ts, sides, hand_lms, out["face"])
+                + (pipe.hud(), timings)
+            )
+    finally:
+        for pipe in pipelines.values():
+            pipe.close()
+        for ring in rings.values():
+            ring.close()
+
+
+class InferenceError(RuntimeError):
+    # A job failed in an inference process (station: whose job it was), or
+    # the process itself is gone (station None)
+    def __init__(self, message, station=None):
+        super().__init__(message)
+        self.station = station
+
+
+class FrameLane:
+    # Submit side of one station: its shared frame ring and free slots
+    def __init__(self, depth):
+        self.depth = depth
+        self.ring = None
+        self.free_slots = list(range(depth))
+        self.lock = threading.Lock()
+        self.in_flight = threading.BoundedSemaphore(depth)
+
+
+class InferenceProcess:
+    # UI-side handle of an inference process. Every station submitting to it
+    # has at most `depth` frames in flight; submit() blocks until the worker
+    # hands a slot back.
+    def __init__(self, depth=2):
+        self.depth = depth
+        ctx = multiprocessing.get_context("spawn")
+        self.jobs = ctx.Queue()
+        self.results = ctx.Queue()
+        self.proc = ctx.Process(
+            target=inference_worker_main,
+            args=(self.jobs, self.results),
+            daemon=True,
+        )
+        self.lanes = {}
+        self.lanes_lock = threading.Lock()
+
+    def start(self):
+        self.proc.start()
+
+    def _lane(self, station):
+        with self.lanes_lock:
+            lane = self.lanes.get(station)
+            if lane is None:
+                lane = self.lanes[station] = FrameLane(self.depth)
+            return lane
+
+    def check(self):
+        # Raises InferenceError once the worker process has exited
+        if not self.proc.is_alive():
+            code = self.proc.exitcode
+            raise InferenceError(f"inference process exited (code {code})")
+
+    def submit(self, frame, seq, ts, opts, timeout=0.1, station=0):
+        self.check()
+        lane = self._lane(station)
+        if not lane.in_flight.acquire(timeout=timeout):
+            return False
+        if lane.ring is None:
+            lane.ring = SharedFrameRing.create(self.depth, frame.shape)
+        elif lane.ring.shape[1:] != frame.shape:
+            lane.in_flight.release()
+            return False
+        with lane.lock:
+            slot = lane.free_slots.pop()
+        np.copyto(lane.ring.frames[slot], frame)
+        ring = lane.ring
+        self.jobs.put((station, ring.name, ring.shape, slot, seq, ts, opts))
+        return True
+
+    def get_result(self, timeout=0.1):
+        # -> (station, seq, ts, sides, hands, face, hud, timings) or None;
+        # raises InferenceError for a failed job or a dead worker
+        try:
+            res = self.results.get(timeout=timeout)
+        except queue.Empty:
+            self.check()
+            return None
+        station, slot = res[:2]
+        lane = self._lane(station)
+        with lane.lock:
+            lane.free_slots.append(slot)
+        lane.in_flight.release()
+        if len(res) == 3:
+            raise InferenceError(res[2], station)
+        return (station,) + res[2:]
+
+    def stop(self):
+        if self.proc.is_alive():
+            self.jobs.put(None)
+            self.proc.join(timeout=3.0)
+            if self.proc.is_alive():
+                self.proc.terminate()
+                self.proc.join(timeout=1.0)
+        for lane in self.lanes.values():
+            if lane.ring is not None:
+                lane.ring.close()
+                lane.ring = None
+
+
+# pynput's special keys, used where no keyboard backend can be loaded (no
+# display, CI); RecordingKeyboard records these stand-ins all the same
+STANDARD_KEYS = (
+    "alt alt_l alt_r alt_gr backspace caps_lock cmd cmd_l cmd_r ctrl ctrl_l"
+    " ctrl_r delete down end enter esc home insert left menu num_lock"
+    " page_down page_up pause print_screen right scroll_lock shift shift_l"
+    " shift_r space tab up media_play_pause media_volume_mute"
+    " media_volume_down media_volume_up media_previous media_next"
+).split() + [f"f{i}" for i in range(1, 21)]
+StandInKey = namedtuple("StandInKey", "name")
+KEY_NAMES = {}
+
+
+def key_names():
+    # Every special key by name, plus the spellings older settings use. Built
+    # on first use from pynput's Key; stand-ins only where no backend loads,
+    # so a key this platform lacks is rejected by compile_binding.
+    if not KEY_NAMES:
+        try:
+            from pynput.keyboard import Key
+
+            names = {k.name: k for k in Key}
+        except ImportError:
+            names = {name: StandInKey(name) for name in STANDARD_KEYS}
+        if "caps_lock" in names:
+            names["capslock"] = names["caps_lock"]
+        KEY_NAMES.update(names)
+    return KEY_NAMES
+
+
+def compile_binding(key_str):
+    # "ctrl+tab, e" -> ((Key.ctrl, Key.tab), ("e",)); raises ValueError
+    if not key_str.strip():
+        return ()
+    names = key_names()
+    combos = []
+    for combo in key_str.split(","):
+        keys = []
+        for p in combo.replace(" ", "").lower().split("+"):
+            if not p:
+                raise ValueError(f"Empty key in {key_str!r}")
+            elif len(p) == 1:
+                keys.append(p)
+            elif p in names:
+                keys.append(names[p])
+            else:
+                raise ValueError(f"Unknown key {p!r} in {key_str!r}")
+        combos.append(tuple(keys))
+    return tuple(combos)
+
+
+def binding_keys(bindings):
+    # Flattens several compiled bindings into one ordered key list
+    return [k for binding in bindings for combo in binding for k in combo]
+
+
+def key_name(key):
+    return key.upper() if isinstance(key, str) else key.name.upper()
+
+
+def send_key_events(keyboard, events, ts, submitted, samples):
+    # Hands (press, key) events to the keyboard in order and records the
+    # press call time, camera-to-keypress (e2e) and submit-to-sent (emit)
+    # latency. ts: capture time of the frame that asked, or None.
+    for press, key in events:
+        start = time.perf_counter()
+        try:
+            if press:
+                keyboard.press(key)
+            else:
+                keyboard.release(key)
+        except Exception:
+            continue
+        if press:
+            done = time.perf_counter()
+            samples.append(("press", (done - start) * 1000))
+            if ts is not None:
+                samples.append(("e2e", (done - ts) * 1000))
+    samples.append(("emit", (time.perf_counter() - submitted) * 1000))
+
+
+def coalesce_key_events(batches):
+    # batches: event lists in submit order, merged into one list. A release
+    # that ends a key held since an earlier batch, followed later by a press
+    # of the same key that stays down, only bounces the held key, so both are
+    # dropped. Taps (press and release in one batch) are always kept, as is
+    # the order of everything else, so combos stay intact.
+    # -> (events, number dropped)
+    out = []
+    pressed_in = {}  # key -> batch of its latest press, if in the backlog
+    bounce = {}  # key -> index in out of a release that ended an older hold
+    total = 0
+    for batch, events in enumerate(batches):
+        total += len(events)
+        for i, (press, key) in enumerate(events):
+            if press:
+                idx = bounce.pop(key, None)
+                if idx is not None and (False, key) not in events[i + 1 :]:
+                    out[idx] = None  # still held from before the release
+                    continue
+                pressed_in[key] = batch
+            else:
+                if pressed_in.pop(key, -1) < batch:
+                    bounce[key] = len(out)
+                else:
+                    bounce.pop(key, None)
+            out.append((press, key))
+    kept = [ev for ev in out if ev is not None]
+    return kept, total - len(kept)
+
+
+class KeyEmitter:
+    # Output thread between the gesture logic and the keyboard. Batches of
+    # events queue up (bounded, the logic waits only when the keyboard is
+    # far behind); a batch that finds others waiting is merged with them and
+    # coalesced before sending. Any object with press()/release() works as
+    # the keyboard, e.g. RecordingKeyboard.
+    def __init__(self, keyboard, samples, depth=64):
+        self.keyboard = keyboard
+        self.samples = samples
+        self.jobs = queue.Queue(maxsize=depth)
+
+        self.max_depth = 0
+        self.coalesced = 0
+        self.blocked = 0
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    @property
+    def depth(self):
+        return self.jobs.qsize()
+
+    def submit(self, events, ts):
+        job = (events, ts, time.perf_counter())
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            self.blocked += 1
+            self.jobs.put(job)
+        self.max_depth = max(self.max_depth, self.jobs.qsize())
+
+    def _loop(self):
+        while True:
+            taken = [self.jobs.get()]
+            while True:
+                try:
+                    taken.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in taken
+            jobs = [job for job in taken if job is not None]
+            if len(jobs) > 1:
+                # Behind: send the backlog as one batch, timed from the oldest
+                # submit and attributed to the newest frame
+                batches = [events for events, _, _ in jobs]
+                events, dropped = coalesce_key_events(batches)
+                self.coalesced += dropped
+                jobs = [(events, jobs[-1][1], jobs[0][2])]
+            for events, ts, submitted in jobs:
+                send_key_events(self.keyboard, events, ts, submitted, self.samples)
+            for _ in taken:
+                self.jobs.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        # Blocks until everything submitted so far reached the keyboard
+        self.jobs.join()
+
+    def stop(self):
+        self.jobs.put(None)
+        self.thread.join(timeout=2.0)
+
+
+class KeyReconciler:
+    # Tracks which keys are actually held and only sends press/release events
+    # when the set the gesture logic asks for changes. Events go out through
+    # a KeyEmitter thread when one is enabled, otherwise inline.
+    def __init__(self, keyboard):
+        self.keyboard = keyboard
+        self.emitter = None
+        self.held = {}  # key -> None, kept in press order
+        self.pending = []  # (press, key) events of the current call
+        self.lock = threading.Lock()
+
+        # Events sent to the keyboard vs. per-frame requests that needed none
+        self.emitted = 0
+        self.suppressed = 0
+
+        # (stage, ms) latency samples of sent events, drained by the stats
+        self.samples = deque(maxlen=1024)
+
+    @property
+    def active_keys(self):
+        with self.lock:
+            return [key_name(k) for k in self.held]
+
+    def use_thread(self, enabled):
+        # Stopping sends whatever is still queued first
+        with self.lock:
+            if enabled and self.emitter is None:
+                self.emitter = KeyEmitter(self.keyboard, self.samples)
+            elif not enabled and self.emitter is not None:
+                self.emitter.stop()
+                self.emitter = None
+
+    def take_samples(self):
+        while self.samples:
+            yield self.samples.popleft()
+
+    def summary(self):
+        text = f"{self.emitted} sent / {self.suppressed} saved"
+        emitter = self.emitter
+        if emitter is not None:
+            text += f" / q {emitter.depth} (max {emitter.max_depth})"
+        return text
+
+    def _send(self, key, press):
+        self.pending.append((press, key))
+        self.emitted += 1
+
+    def _flush(self, ts):
+        if not self.pending:
+            return
+        events, self.pending = self.pending, []
+        if self.emitter is not None:
+            self.emitter.submit(events, ts)
+        else:
+            send_key_events(
+                self.keyboard, events, ts, time.perf_counter(), self.samples
+            )
+
+    def sync(self, desired, considered=(), ts=None):
+        # desired: keys that should be down after this frame, in press order.
+        # considered: every key the frame made a decision about; the ones that
+        # did not change are counted as suppressed events.
+        with self.lock:
+            wanted = dict.fromkeys(desired)
+            changed = set()
+            for k in reversed(list(self.held)):
+                if k not in wanted:
+                    self._send(k, False)
+                    del self.held[k]
+                    changed.add(k)
+            for k in wanted:
+                if k not in self.held:
+                    self._send(k, True)
+                    self.held[k] = None
+                    changed.add(k)
+            self.suppressed += len(set(considered) - changed)
+            self._flush(ts)
+
+    def tap(self, combo, ts=None):
+        # Keys already held for another gesture are left alone
+        with self.lock:
+            keys = [k for k in combo if k not in self.held]
+            for k in keys:
+                self._send(k, True)
+            for k in reversed(keys):
+                self._send(k, False)
+            self._flush(ts)
+
+    def release_held(self):
+        with self.lock:
+            for k in reversed(list(self.held)):
+                self._send(k, False)
+            self.held.clear()
+            self._flush(None)
+
+    def flush(self):
+        if self.emitter is not None:
+            self.emitter.flush()
+
+    def close(self):
+        self.use_thread(False)
+
+
+def read_settings_file(path):
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except:
+            pass
+    return {}
+
+
+def make_var(value):
+    # Tk variable matching the type of a DEFAULT_SETTINGS entry
+    if isinstance(value, bool):
+        return tk.BooleanVar(value=value)
+    if isinstance(value, int):
+        return tk.IntVar(value=value)
+    if isinstance(value, float):
+        return tk.DoubleVar(value=value)
+    return tk.StringVar(value=value)
+
+
+class Settings:
+    # Frozen snapshot of every setting plus the compiled key bindings and
+    # gesture rules. The Tk thread builds a new one whenever a variable
+    # changes and swaps it in with a single assignment, so worker threads only
+    # read plain attributes. rule_specs=None means the default rule set.
+    def __init__(self, values, bindings, rule_specs=None):
+        object.__setattr__(self, "values", MappingProxyType(dict(values)))
+        object.__setattr__(self, "bindings", MappingProxyType(dict(bindings)))
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "rule_specs", rule_specs)
+        specs = DEFAULT_RULES if rule_specs is None else rule_specs
+        object.__setattr__(self, "rules", compile_rules(specs, values, bindings))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Settings snapshots are read-only")
+
+    def replace(self, **changes):
+        return Settings(dict(self.values, **changes), self.bindings, self.rule_specs)
+
+    @classmethod
+    def from_dict(cls, data):
+        # Unknown keys are ignored and malformed bindings are left unbound
+        values = dict(DEFAULT_SETTINGS)
+        for k, v in data.items():
+            if k in values:
+                try:
+                    values[k] = type(DEFAULT_SETTINGS[k])(v)
+                except (TypeError, ValueError):
+                    pass
+        bindings = {}
+        for name, value in values.items():
+            if name.startswith("key_"):
+                try:
+                    bindings[name] = compile_binding(value)
+                except ValueError:
+                    bindings[name] = ()
+        rule_specs = data.get("rules")
+        return cls(
+            values, bindings, rule_specs if isinstance(rule_specs, list) else None
+        )
+
+    @classmethod
+    def load(cls, path=SETTINGS_FILE):
+        settings = cls.from_dict(read_settings_file(path))
+        for error in settings.rules.errors:
+            print(f"{path}: {error}")
+        return settings
+
+
+# --- FEATURES ---
+# Everything the gesture logic needs from one hand / one frame
+HandFeatures = namedtuple("HandFeatures", "side tilt fingers_up up_count gap rock")
+FrameFeatures = namedtuple("FrameFeatures", "hands mouth_ratio eye_gap has_face")
+
+
+ALL_FEATURES = frozenset(("tilt", "fingers", "gap", "mouth_ratio", "eye_gap"))
+
+
+def extract_features(sides, hands, face, needed=ALL_FEATURES):
+    # Geometry for all hands is computed in one batched NumPy pass; only the
+    # per-finger comparisons run in Python, on plain floats. Features not in
+    # `needed` are left None ("fingers" covers fingers_up, up_count, rock).
+    hand_feats = ()
+    if len(sides):
+        n = len(sides)
+        h = hands[:, :, :2].astype(np.float64)
+        tilt = gap = lift = (None,) * n
+        if "tilt" in needed:
+            wrist_to_mcp = h[:, 9] - h[:, 0]
+            angles = np.arctan2(wrist_to_mcp[:, 0], -wrist_to_mcp[:, 1])
+            tilt = np.degrees(angles).tolist()
+        if "fingers" in needed:
+            # Tip above its PIP joint (index 8/6, middle 12/10, ring 16/14,
+            # pinky 20/18) means the finger is up
+            lift = (h[:, 6:19:4, 1] - h[:, 8:21:4, 1]).tolist()
+        if "gap" in needed:
+            spread = h[:, 8] - h[:, 12]
+            gap = np.hypot(spread[:, 0], spread[:, 1]).tolist()
+        feats = []
+        for side, angle, fingers, g in zip(sides, tilt, lift, gap):
+            up = up_count = rock = None
+            if fingers is not None:
+                i, m, r, p = fingers
+                up = (i > 0, m > 0, r > 0, p > 0)
+                up_count = sum(up)
+                # Index and pinky up, middle and ring down
+                rock = i > 0 and p > 0 and m < 0 and r < 0
+            feats.append(HandFeatures(side, angle, up, up_count, g, rock))
+        hand_feats = tuple(feats)
+
+    mouth_ratio = eye_gap = None
+    if face is not None:
+        # forehead, chin, upper lip, lower lip, then the two eyelid pairs
+        fy = face[:, 1].tolist()
+        if "mouth_ratio" in needed:
+            mouth_ratio = abs(fy[2] - fy[3]) / abs(fy[0] - fy[1])
+        if "eye_gap" in needed:
+            eye_gap = (abs(fy[4] - fy[5]) + abs(fy[6] - fy[7])) / 2
+    return FrameFeatures(hand_feats, mouth_ratio, eye_gap, face is not None)
+
+
+class OneEuroFilter:
+    # One Euro filter (Casiez et al.): a low-pass whose cutoff rises with
+    # speed, so jitter at rest is smoothed hard while fast motion keeps up.
+    # Its velocity estimate also extrapolates the value between samples.
+    def __init__(self, min_cutoff=1.0, beta=0.0, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.raw = self.x = None
+        self.dx = 0.0
+        self.t = 0.0
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        return 1.0 / (1.0 + 1.0 / (2 * np.pi * cutoff * dt))
+
+    def update(self, x, t):
+        if self.x is None or t <= self.t:
+            self.raw = self.x = x
+            self.t = t
+            return x
+        dt = t - self.t
+        self.dx += self._alpha(self.d_cutoff, dt) * ((x - self.raw) / dt - self.dx)
+        cutoff = self.min_cutoff + self.beta * abs(self.dx)
+        self.x += self._alpha(cutoff, dt) * (x - self.x)
+        self.raw = x
+        self.t = t
+        return self.x
+
+    def predict(self, t, smoothed=True, horizon=0.1):
+        # Value at time t from the last sample and velocity; extrapolation is
+        # capped at `horizon` seconds
+        base = self.x if smoothed else self.raw
+        return base + self.dx * min(max(t - self.t, 0.0), horizon)
+
+
+class FeatureFilter:
+    # Per-hand One Euro filters over the continuous features the hold keys
+    # read (tilt angle and finger gap). A hand whose features repeat exactly
+    # is a held detector result, not a new measurement; with prediction on it
+    # is extrapolated to the current frame instead.
+    PARAMS = {"tilt": (1.0, 0.05), "gap": (1.0, 20.0)}  # min_cutoff, beta
+
+    def __init__(self):
+        self.filters = {}  # side -> {feature: OneEuroFilter}
+        self.last_raw = {}  # side -> (tilt, gap) of the last measurement
+
+    def apply(self, feats, t, smooth, predict):
+        hands = []
+        for hand in feats.hands:
+            side = hand.side
+            filters = self.filters.get(side)
+            if filters is None:
+                filters = self.filters[side] = {
+                    name: OneEuroFilter(*params) for name, params in self.PARAMS.items()
+                }
+            raw = (hand.tilt, hand.gap)
+            fresh = raw != self.last_raw.get(side)
+            if fresh:
+                self.last_raw[side] = raw
+            values = {}
+            for name, x in zip(("tilt", "gap"), raw):
+                if x is None:
+                    continue  # not needed by any rule
+                f = filters[name]
+                if fresh:
+                    v = f.update(x, t)
+                    values[name] = v if smooth else x
+                elif predict:
+                    values[name] = f.predict(t, smooth)
+                else:
+                    values[name] = f.x if smooth else x
+            hands.append(hand._replace(**values))
+
+        # A hand that left the picture starts from scratch when it returns
+        seen = {hand.side for hand in feats.hands}
+        for side in list(self.filters):
+            if side not in seen:
+                del self.filters[side]
+                self.last_raw.pop(side, None)
+        return feats._replace(hands=tuple(hands))
+
+
+# --- GESTURE RULES ---
+# A rule presses `binding` while its conditions hold. Each condition compares
+# one feature with a threshold: a number or a setting name, with a leading
+# "-" to negate it. An optional hysteresis (number or setting name) relaxes
+# the threshold while the rule is active. Rules sharing a `group` are
+# exclusive: the one active last frame is tried first, then the others in
+# order, and the first match wins. Actions:
+#   hold  - key down while the rule is active
+#   tap   - tapped once when the group becomes active, re-armed when it ends
+#   latch - each activation toggles the key between held and released
+# `hud` names a HUD line, showing `show` while active (with {value} / {int}
+# for the first condition's feature) and `idle` otherwise.
+DEFAULT_RULES = [
+    {
+        "name": "mouth",
+        "feature": "mouth_ratio",
+        "op": ">",
+        "threshold": "threshold_mouth",
+        "action": "tap",
+        "binding": "key_mouth",
+        "hud": "Mouth",
+        "show": "OPEN",
+        "idle": "Closed",
+    },
+    {
+        "name": "eye",
+        "feature": "eye_gap",
+        "op": "<",
+        "threshold": "threshold_eye",
+        "action": "tap",
+        "binding": "key_eye",
+        "hud": "Eye",
+        "show": "BLINK",
+        "idle": "Open",
+    },
+    {
+        "name": "left_tilt_left",
+        "hand": "Left",
+        "group": "left_tilt",
+        "feature": "tilt",
+        "op": "<",
+        "threshold": "-threshold_left_tilt_left",
+        "hysteresis": "tilt_hysteresis",
+        "action": "hold",
+        "binding": "key_left_tilt_l",
+        "hud": "Left Hand",
+        "show": "LEFT ({int}°)",
+        "idle": "CENTER",
+    },
+    {
+        "name": "left_tilt_right",
+        "hand": "Left",
+        "group": "left_tilt",
+        "feature": "tilt",
+        "op": ">",
+        "threshold": "threshold_left_tilt_right",
+        "hysteresis": "tilt_hysteresis",
+        "action": "hold",
+        "binding": "key_left_tilt_r",
+        "show": "RIGHT ({int}°)",
+    },
+    {
+        "name": "left_rock",
+        "hand": "Left",
+        "feature": "rock",
+        "op": "==",
+        "threshold": 1,
+        "action": "tap",
+        "binding": "key_left_rock",
+        "hud": "Left Rock",
+        "show": "YES 🤘",
+        "idle": "No",
+    },
+    {
+        "name": "left_spread",
+        "hand": "Left",
+        "group": "left_macro",
+        "when": [["up_count", ">=", 3], ["gap", ">", "threshold_left_spread"]],
+        "action": "tap",
+        "binding": "key_left_spread",
+    },
+    {
+        "name": "left_closed",
+        "hand": "Left",
+        "group": "left_macro",
+        "feature": "up_count",
+        "op": ">=",
+        "threshold": 3,
+        "action": "tap",
+        "binding": "key_left_closed",
+    },
+    {
+        "name": "right_tilt_left",
+        "hand": "Right",
+        "group": "right_tilt",
+        "feature": "tilt",
+        "op": "<",
+        "threshold": "-threshold_right_tilt_left",
+        "hysteresis": "tilt_hysteresis",
+        "action": "hold",
+        "binding": "key_right_left",
+        "hud": "Right Hand",
+        "show": "LEFT ({int}°)",
+        "idle": "CENTER",
+    },
+    {
+        "name": "right_tilt_right",
+        "hand": "Right",
+        "group": "right_tilt",
+        "feature": "tilt",
+        "op": ">",
+        "threshold": "threshold_right_tilt_right",
+        "hysteresis": "tilt_hysteresis",
+        "action": "hold",
+        "binding": "key_right_right",
+        "show": "RIGHT ({int}°)",
+    },
+    {
+        "name": "right_rock",
+        "hand": "Right",
+        "feature": "rock",
+        "op": "==",
+        "threshold": 1,
+        "action": "tap",
+        "binding": "key_right_rock",
+        "hud": "Right Rock",
+        "show": "YES 🤘",
+        "idle": "No",
+    },
+    {
+        "name": "right_forward",
+        "hand": "Right",
+        "group": "right_gas",
+        "when": [
+            ["up_count", ">=", 3],
+            ["gap", ">", "threshold_right_gas_brake", "gap_hysteresis"],
+        ],
+        "action": "hold",
+        "binding": "key_right_forward",
+    },
+    {
+        "name": "right_backward",
+        "hand": "Right",
+        "group": "right_gas",
+        "when": [
+            ["up_count", ">=", 3],
+            ["gap", "<=", "threshold_right_gas_brake", "gap_hysteresis"],
+        ],
+        "action": "hold",
+        "binding": "key_right_backward",
+    },
+]
+# Feature -> (landmark source, what extract_features has to compute)
+RULE_FEATURES = {
+    "tilt": ("hands", "tilt"),
+    "gap": ("hands", "gap"),
+    "up_count": ("hands", "fingers"),
+    "rock": ("hands", "fingers"),
+    "mouth_ratio": ("face", "mouth_ratio"),
+    "eye_gap": ("face", "eye_gap"),
+}
+RULE_OPS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+}
+RULE_ACTIONS = ("hold", "tap", "latch")
+
+# `relaxed` is the threshold with hysteresis applied
+RuleCondition = namedtuple("RuleCondition", "feature compare threshold relaxed")
+GestureRule = namedtuple("GestureRule", "name conditions binding show")
+RuleGroup = namedtuple("RuleGroup", "name hand action rules bindings hud idle")
+# groups_by_source: None for the face, else a handedness label
+RulePlan = namedtuple("RulePlan", "groups groups_by_source features detectors errors")
+
+
+def rule_number(value, values):
+    if isinstance(value, str):
+        name = value.lstrip("-")
+        if name not in values:
+            raise ValueError(f"unknown setting {name!r}")
+        return -float(values[name]) if value.startswith("-") else float(values[name])
+    return float(value)
+
+
+def compile_rule(spec, values, bindings):
+    # -> (hand, GestureRule) for one rule dict; raises ValueError
+    conditions = spec.get("when") or [
+        [spec.get("feature"), spec.get("op"), spec.get("threshold", 0)]
+        + ([spec["hysteresis"]] if "hysteresis" in spec else [])
+    ]
+    hand = spec.get("hand")
+    compiled = []
+    for cond in conditions:
+        feature, op, threshold = cond[:3]
+        if feature not in RULE_FEATURES:
+            raise ValueError(f"unknown feature {feature!r}")
+        if op not in RULE_OPS:
+            raise ValueError(f"unknown comparison {op!r}")
+        source = RULE_FEATURES[feature][0]
+        if (source == "face") != (hand is None) or hand not in (None, "Left", "Right"):
+            raise ValueError(
+                f"{feature} needs hand "
+                + ("null" if source == "face" else '"Left" or "Right"')
+            )
+        limit = rule_number(threshold, values)
+        margin = rule_number(cond[3], values) if len(cond) > 3 else 0.0
+        if op in (">", ">="):
+            relaxed = limit - margin
+        elif op in ("<", "<="):
+            relaxed = limit + margin
+        else:
+            relaxed = limit
+        compiled.append(RuleCondition(feature, RULE_OPS[op], limit, relaxed))
+
+    key = spec.get("binding", "")
+    if not isinstance(key, str):
+        raise TypeError(f"binding must be a string, not {key!r}")
+    binding = bindings[key] if key in bindings else compile_binding(key)
+    name = spec.get("name", "rule")
+    if not isinstance(name, str):
+        raise TypeError(f"name must be a string, not {name!r}")
+    show = spec.get("show", "")
+    check_show(show)
+    return hand, GestureRule(name, tuple(compiled), binding, show)
+
+
+def check_show(show):
+    # "show" is formatted with the matching feature as {value} and {int};
+    # raises ValueError or TypeError for anything evaluate() could not format
+    if not isinstance(show, str):
+        raise TypeError(f"show must be a string, not {show!r}")
+    for _, field, _, _ in string.Formatter().parse(show):
+        if field is not None and field not in ("value", "int"):
+            raise ValueError(f"show can use {{value}} and {{int}}, not {{{field}}}")
+    try:
+        show.format(value=0.0, int=0)
+    except (KeyError, IndexError) as e:
+        raise ValueError(f"bad placeholder {e} in show {show!r}")
+
+
+def compile_rules(specs, values, bindings):
+    # Compiles rule dicts against one settings snapshot. Broken rules are
+    # skipped and reported in .errors; groups with no bound key are dropped,
+    # so their features and detectors are not computed at all.
+    groups = {}
+    errors = []
+    for i, spec in enumerate(specs):
+        if not isinstance(spec, dict) or spec.get("enabled") is False:
+            continue
+        label = spec.get("name", f"#{i + 1}")
+        try:
+            action = spec.get("action", "hold")
+            if action not in RULE_ACTIONS:
+                raise ValueError(f"unknown action {action!r}")
+            hand, rule = compile_rule(spec, values, bindings)
+            for field in ("hud", "idle"):
+                text = spec.get(field)
+                if text is not None and not isinstance(text, str):
+                    raise TypeError(f"{field} must be a string, not {text!r}")
+            name = spec.get("group", label)
+            if not isinstance(name, str):
+                raise TypeError(f"group must be a string, not {name!r}")
+            group = groups.get(name)
+        except (AttributeError, TypeError, ValueError) as e:
+            errors.append(f"rule {label}: {e}")
+            continue
+        if group is None:
+            group = groups[name] = {"hand": hand, "action": action, "rules": []}
+            group.update(hud=None, idle="")
+        elif (group["hand"], group["action"]) != (hand, action):
+            errors.append(f"rule {label}: group {name!r} mixes hands or actions")
+            continue
+        group["rules"].append(rule)
+        if group["hud"] is None and spec.get("hud"):
+            group["hud"] = spec["hud"]
+            group["idle"] = spec.get("idle") or ""
+
+    plan_groups = []
+    by_source = {}
+    features = set()
+    detectors = set()
+    for name, g in groups.items():
+        rules = tuple(g["rules"])
+        if not any(rule.binding for rule in rules):
+            continue
+        bindings_used = tuple(rule.binding for rule in rules)
+        group = RuleGroup(
+            name, g["hand"], g["action"], rules, bindings_used, g["hud"], g["idle"]
+        )
+        plan_groups.append(group)
+        by_source.setdefault(group.hand, []).append(group)
+        for rule in rules:
+            for cond in rule.conditions:
+                source, feature = RULE_FEATURES[cond.feature]
+                detectors.add(source)
+                features.add(feature)
+    return RulePlan(
+        tuple(plan_groups),
+        {k: tuple(v) for k, v in by_source.items()},
+        frozenset(features),
+        tuple(d for d in ("hands", "face") if d in detectors),
+        tuple(errors),
+    )
+
+
+def rule_matches(rule, src, active):
+    # active: the rule was the group's match last frame, use relaxed limits
+    for cond in rule.conditions:
+        limit = cond.relaxed if active else cond.threshold
+        if not cond.compare(getattr(src, cond.feature), limit):
+            return False
+    return True
+
+
+class GestureEngine:
+    # Turns landmark arrays into key events by evaluating the settings' rule
+    # plan. Holds per-group state, HUD state and held keys; knows nothing
+    # about Tk, cameras or models, so the same object drives the window,
+    # headless runs and benchmarks.
+    def __init__(self, keyboard, settings=None):
+        self.settings = settings or Settings.from_dict({})
+        self.keys = KeyReconciler(keyboard)
+        self.filter = FeatureFilter()
+        self.frame_ts = None  # capture time of the frame being evaluated
+
+        # Group name -> index of the rule that matched last frame (hold and
+        # tap groups), or of the rule whose key is latched (latch groups)
+        self.active = {}
+        self.latched = {}
+
+        # The last frame's features and group transitions, for the event bus:
+        # (group, rule active before or None, rule active now or None)
+        self.features = None
+        self.edges = []
+
+        # HUD Status Information
+        self.hud_status = {}
+        for group in self.settings.rules.groups:
+            if group.hud:
+                self.hud_status[group.hud] = "Passive"
+        self.hud_status["Keys"] = "-"
+
+    def apply(self, sides, hands, face, ts=None):
+        # sides: handedness label per hand, hands: (n, 21, 3) landmark array,
+        # face: FACE_POINTS landmarks or None, ts: capture time of the frame
+        cfg = self.settings
+        self.keys.use_thread(cfg.async_keys)
+        self.frame_ts = ts
+        feats = extract_features(sides, hands, face, cfg.rules.features)
+        if cfg.smooth_features or cfg.predict_features:
+            t = time.perf_counter() if ts is None else ts
+            feats = self.filter.apply(
+                feats, t, cfg.smooth_features, cfg.predict_features
+            )
+        self.apply_features(feats, cfg.rules)
+
+    def apply_features(self, feats, rules):
+        # rules: the plan feats were extracted for. The Tk thread may swap
+        # self.settings meanwhile, and a newly bound group would read
+        # features that were never computed.
+        self.features = feats
+        self.edges.clear()
+        by_source = rules.groups_by_source
+        hold = []  # hold bindings that should be down after this frame
+        decided = []  # every hold binding evaluated this frame
+
+        for group in by_source.get(None, ()):
+            if feats.has_face:
+                self.evaluate(group, feats, hold, decided)
+            else:
+                self.absent(group, hold, decided)
+        # Hands in detection order, so taps go out in the order they are seen
+        for hand in feats.hands:
+            for group in by_source.get(hand.side, ()):
+                self.evaluate(group, hand, hold, decided)
+        seen = {hand.side for hand in feats.hands}
+        for side, groups in by_source.items():
+            if side is not None and side not in seen:
+                for group in groups:
+                    self.absent(group, hold, decided)
+
+        # Hold keys are reconciled once per frame, so only changes reach the
+        # keyboard. Anything not asked for this frame (e.g. a hand that left
+        # the picture) is released.
+        self.keys.sync(binding_keys(hold), binding_keys(decided), self.frame_ts)
+        self.hud_status["Keys"] = self.keys.summary()
+
+    def evaluate(self, group, src, hold, decided):
+        rules = group.rules
+        last = self.active.get(group.name)
+        match = None
+        if last is not None and rule_matches(rules[last], src, True):
+            match = last
+        else:
+            for i, rule in enumerate(rules):
+                if i != last and rule_matches(rule, src, False):
+                    match = i
+                    break
+        self.active[group.name] = match
+        if match != last:
+            self.edges.append(
+                (
+                    group.name,
+                    None if last is None else rules[last].name,
+                    None if match is None else rules[match].name,
+                )
+            )
+
+        shown = match
+        if group.action == "hold":
+            decided += group.bindings
+            if match is not None:
+                hold.append(rules[match].binding)
+        elif match is not None and last is None:
+            if group.action == "tap":
+                self.tap_keys(rules[match].binding)
+            elif self.latched.get(group.name) is None:
+                self.latched[group.name] = match
+            else:
+                self.latched[group.name] = None
+        if group.action == "latch":
+            shown = self.hold_latched(group, hold, decided)
+
+        if group.hud:
+            if shown is None:
+                self.hud_status[group.hud] = group.idle
+            else:
+                value = getattr(src, rules[shown].conditions[0].feature)
+                text = rules[shown].show
+                self.hud_status[group.hud] = text.format(value=value, int=int(value))
+
+    def absent(self, group, hold, decided):
+        # Nothing to evaluate. Holds end; taps stay armed or locked as they
+        # were, and latched keys stay down.
+        if group.action == "hold":
+            last = self.active.get(group.name)
+            if last is not None:
+                self.edges.append((group.name, group.rules[last].name, None))
+            self.active[group.name] = None
+        elif group.action == "latch":
+            self.hold_latched(group, hold, decided)
+        if group.hud:
+            self.hud_status[group.hud] = "Passive"
+
+    def hold_latched(self, group, hold, decided):
+        decided += group.bindings
+        latched = self.latched.get(group.name)
+        if latched is not None:
+            hold.append(group.rules[latched].binding)
+        return latched
+
+    def tap_keys(self, binding):
+        for combo in binding:
+            self.keys.tap(combo, self.frame_ts)
+
+
+# --- CAMERA CAPTURE ---
+MIRRORED_SIDE = {"Left": "Right", "Right": "Left"}
+
+
+def configure_capture(vid, cfg):
+    # Compressed frames, a target rate and the smallest driver queue; FOURCC
+    # has to come before the size on V4L2. Backends ignore what they lack.
+    if cfg.camera_mjpg:
+        vid.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+    vid.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+    vid.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+    if cfg.camera_fps > 0:
+        vid.set(cv2.CAP_PROP_FPS, cfg.camera_fps)
+    if cfg.camera_buffer_size > 0:
+        vid.set(cv2.CAP_PROP_BUFFERSIZE, cfg.camera_buffer_size)
+
+
+def grab_latest(vid, max_skip=4, queued_ms=2.0, dst=None):
+    # A grab() that returns almost at once got a frame that was already
+    # waiting in the driver queue, i.e. a stale one. Keep grabbing until one
+    # has to be waited for, then decode only that frame (into dst if given).
+    # -> (frame or None, stale frames skipped)
+    start = time.perf_counter()
+    if not vid.grab():
+        return None, 0
+    skipped = 0
+    while skipped < max_skip and (time.perf_counter() - start) * 1000 < queued_ms:
+        start = time.perf_counter()
+        if not vid.grab():
+            break
+        skipped += 1
+    ret, frame = vid.retrieve(dst)
+    return (frame if ret else None), skipped
+
+
+def capture_frame(vid, cfg, pool, grab_latest_frame=True):
+    # Decodes the next frame into a pool frame and mirrors it into another
+    # unless the landmarks are mirrored instead. -> (frame held once by the
+    # caller or None, stale frames skipped)
+    buf = pool.acquire()
+    if grab_latest_frame and cfg.camera_grab_latest:
+        frame, skipped = grab_latest(vid, dst=buf)
+    else:
+        ret, frame = vid.read(buf)
+        frame, skipped = (frame if ret else None), 0
+    if frame is None:
+        if buf is not None:
+            pool.release(buf)
+        return None, skipped
+    frame = pool.adopt(frame, buf)
+    if not cfg.mirror_landmarks:
+        flipped = pool.acquire(frame.shape)
+        cv2.flip(frame, 1, dst=flipped)
+        pool.release(frame)
+        frame = flipped
+    return frame, skipped
+
+
+def frame_age_ms(vid):
+    # V4L2 stamps buffers with CLOCK_MONOTONIC, which time.monotonic() reads
+    # too. Other backends report stream time; those ages are discarded.
+    age = time.monotonic() * 1000 - vid.get(cv2.CAP_PROP_POS_MSEC)
+    return age if 0.0 <= age < 1000.0 else None
+
+
+def mirror_landmarks(sides, hands, face):
+    # Same result as running the models on a horizontally flipped frame: x is
+    # reflected and MediaPipe's handedness labels swap
+    sides = tuple(MIRRORED_SIDE[s] for s in sides)
+    if len(hands):
+        hands = hands.copy()
+        hands[..., 0] = 1.0 - hands[..., 0]
+    if face is not None:
+        face = face.copy()
+        face[:, 0] = 1.0 - face[:, 0]
+    return sides, hands, face
+
+
+class CaptureStats:
+    # Delivered camera frame rate, frame age and skipped stale frames,
+    # summarized once per second
+    def __init__(self):
+        self.frames = 0
+        self.skipped = 0
+        self.ages = []
+        self.window_start = time.perf_counter()
+        self.line = "-"
+
+    def add(self, age_ms, skipped):
+        self.frames += 1
+        self.skipped += skipped
+        if age_ms is not None:
+            self.ages.append(age_ms)
+        now = time.perf_counter()
+        elapsed = now - self.window_start
+        if elapsed >= 1.0:
+            age = f"age {np.median(self.ages):.0f}ms" if self.ages else "age n/a"
+            self.line = (
+                f"{self.frames / elapsed:.1f} fps | {age} | {self.skipped} stale"
+            )
+            self.frames = self.skipped = 0
+            self.ages = []
+            self.window_start = now
+        return self.line
+
+
+# --- LANDMARK RECORDING ---
+# File layout: RECORD_MAGIC, a little-endian uint32 header length, a JSON
+# header padded to 64 bytes, then one fixed-size RECORD_DTYPE row per frame.
+# The rows can be memory-mapped directly and every field read as a column.
+RECORD_MAGIC = b"PCREC1\n"
+RECORD_DTYPE = np.dtype(
+    [
+        ("timestamp", "<f8"),
+        ("hand_count", "u1"),
+        ("handedness", "u1", (2,)),  # 0 = none, 1 = Left, 2 = Right
+        ("hands", "<f4", (2, 21, 3)),
+        ("has_face", "u1"),
+        ("face", "<f4", (len(FACE_POINTS), 3)),
+    ]
+)
+SIDE_CODES = {"Left": 1, "Right": 2}
+SIDE_NAMES = {1: "Left", 2: "Right"}
+
+
+class LandmarkRecorder:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.row = np.zeros(1, RECORD_DTYPE)
+        self.frames = 0
+        header = json.dumps(
+            {"dtype": RECORD_DTYPE.descr, "face_points": FACE_POINTS}
+        ).encode()
+        header += b" " * (-(len(RECORD_MAGIC) + 4 + len(header)) % 64)
+        self.f = open(path, "wb")
+        self.f.write(RECORD_MAGIC + struct.pack("<I", len(header)) + header)
+
+    def write(self, timestamp, sides, hands, face):
+        with self.lock:
+            if self.f is None:
+                return
+            row = self.row
+            n = min(len(sides), 2)
+            row["timestamp"] = timestamp
+            row["hand_count"] = n
+            row["handedness"] = 0
+            for i in range(n):
+                row["handedness"][0, i] = SIDE_CODES.get(sides[i], 0)
+            row["hands"][0, :n] = hands[:n]
+            row["has_face"] = face is not None
+            if face is not None:
+                row["face"][0] = face
+            self.f.write(self.row.tobytes())
+            self.frames += 1
+
+    def close(self):
+        with self.lock:
+            if self.f is not None:
+                self.f.close()
+                self.f = None
+
+
+class LandmarkReader:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if f.read(len(RECORD_MAGIC)) != RECORD_MAGIC:
+                raise ValueError(f"{path} is not a PhantomCast landmark recording")
+            (size,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(size))
+        if tuple(header["face_points"]) != FACE_POINTS:
+            raise ValueError(f"{path} was recorded with different face points")
+        offset = len(RECORD_MAGIC) + 4 + size
+        # A trailing partial row (e.g. after a crash) is ignored
+        count = (os.path.getsize(path) - offset) // RECORD_DTYPE.itemsize
+        self.records = np.memmap(
+            path, dtype=RECORD_DTYPE, mode="r", offset=offset, shape=(count,)
+        )
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        # -> (timestamp, sides, hands, face) in the shape GestureEngine.apply
+        # takes; arrays are views into the mapped file
+        rec = self.records
+        ts, hand_count, codes = rec["timestamp"], rec["hand_count"], rec["handedness"]
+        hands, has_face, face = rec["hands"], rec["has_face"], rec["face"]
+        for i in range(len(rec)):
+            n = hand_count[i]
+            sides = tuple(SIDE_NAMES[c] for c in codes[i, :n])
+            yield ts[i], sides, hands[i, :n], face[i] if has_face[i] else None
+
+
+# --- STARTUP ---
+class StartupReport:
+    # Wall time of each startup phase, counted from module import. Phases run
+    # on whichever thread does the work; the current one is shown on the HUD.
+    def __init__(self, hud=None, started=STARTED_AT):
+        self.hud = hud if hud is not None else {}
+        self.started = started
+        self.phases = []  # (name, ms) in completion order
+        self.ready_at = None
+        self.hud["Startup"] = "starting"
+
+    def mark(self, name, since=None):
+        # Records a phase that ran from `since` (default: the start) until now
+        now = time.perf_counter()
+        self.phases.append(
+            (name, (now - (self.started if since is None else since)) * 1000)
+        )
+        return now
+
+    def run(self, name, fn, *args):
+        self.hud["Startup"] = f"{name}..."
+        start = time.perf_counter()
+        result = fn(*args)
+        self.mark(name, start)
+        return result
+
+    def ready(self):
+        # Models loaded on demand later do not move the ready time
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter()
+        self.hud["Startup"] = f"ready in {self.ready_at - self.started:.1f} s"
+
+    def table(self):
+        lines = [f"{name:<20} {ms:8.0f} ms" for name, ms in self.phases]
+        if self.ready_at is not None:
+            total = (self.ready_at - self.started) * 1000
+            lines.append(f"{'ready after':<20} {total:8.0f} ms")
+        return "\n".join(lines)
+
+
+# --- LATENCY INSTRUMENTATION ---
+class LatencyStats:
+    # Latency samples in milliseconds per pipeline stage. With a window only
+    # the newest samples are kept, for rolling percentiles in a long session.
+    def __init__(self, window=None):
+        self.window = window
+        self.samples = {}
+        self.counts = {}  # every sample ever added, for the exporters
+        self.sums = {}
+
+    def add(self, stage, ms):
+        data = self.samples.get(stage)
+        if data is None:
+            data = self.samples[stage] = (
+                deque(maxlen=self.window) if self.window else []
+            )
+            self.counts[stage] = 0
+            self.sums[stage] = 0.0
+        data.append(ms)
+        self.counts[stage] += 1
+        self.sums[stage] += ms
+
+    def percentiles(self, stage, qs=(50, 95, 99)):
+        data = self.samples.get(stage)
+        if not data:
+            return tuple(0.0 for _ in qs)
+        # list() snapshots the samples in one step; another thread may be
+        # adding to them
+        return tuple(float(v) for v in np.percentile(list(data), qs))
+
+    def table(self):
+        lines = [f"{'stage':<10}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)"]
+        for stage in list(self.samples):
+            p50, p95, p99 = self.percentiles(stage)
+            lines.append(f"{stage:<10}{p50:>9.2f}{p95:>9.2f}{p99:>9.2f}")
+        return "\n".join(lines)
+
+
+class LatencyExporter:
+    # Writes LatencyStats snapshots every `interval` seconds. A path ending in
+    # .prom is rewritten in Prometheus text format (for a node_exporter
+    # textfile collector); anything else gets CSV rows appended.
+    def __init__(self, path, interval=5.0):
+        self.path = path
+        self.interval = interval
+        self.last = time.perf_counter()
+
+    def maybe_write(self, stats):
+        now = time.perf_counter()
+        if now - self.last < self.interval:
+            return False
+        self.last = now
+        try:
+            if self.path.endswith(".prom"):
+                self._write_prometheus(stats)
+            else:
+                self._write_csv(stats)
+        except OSError as e:
+            print(f"Latency export to {self.path} failed: {e}")
+        return True
+
+    def _write_csv(self, stats):
+        new = not os.path.exists(self.path)
+        with open(self.path, "a") as f:
+            if new:
+                f.write("time,stage,count,p50_ms,p95_ms,p99_ms\n")
+            now = time.time()
+            for stage in list(stats.samples):
+                p50, p95, p99 = stats.percentiles(stage)
+                count = stats.counts[stage]
+                f.write(f"{now:.3f},{stage},{count},{p50:.3f},{p95:.3f},{p99:.3f}\n")
+
+    def _write_prometheus(self, stats):
+        name = "phantomcast_latency_ms"
+        lines = [
+            f"# HELP {name} Pipeline stage latency in milliseconds",
+            f"# TYPE {name} summary",
+        ]
+        for stage in list(stats.samples):
+            label = f'stage="{stage}"'
+            for q, v in zip((0.5, 0.95, 0.99), stats.percentiles(stage)):
+                lines.append(f'{name}{{{label},quantile="{q}"}} {v:.3f}')
+            lines.append(f"{name}_sum{{{label}}} {stats.sums[stage]:.3f}")
+            lines.append(f"{name}_count{{{label}}} {stats.counts[stage]}")
+        # Written aside and renamed so a scraper never sees half a file
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp, self.path)
+
+
+def add_frame_latency(stats, keys, ts, logic_start, timings):
+    # Completes one frame's timings with the gesture logic, adds them to stats
+    # together with the press / e2e / emit samples of keys sent since the last
+    # call. -> the time the logic finished
+    now = time.perf_counter()
+    timings["logic"] = (now - logic_start) * 1000
+    for stage, ms in timings.items():
+        stats.add(stage, ms)
+    for stage, ms in keys.take_samples():
+        stats.add(stage, ms)
+    return now
+
+
+def latency_summary(stats):
+    # Compact HUD line: median / p95 of detection and camera-to-keypress
+    parts = []
+    for stage, label in (("detect", "det"), ("logic", "logic"), ("e2e", "e2e")):
+        if stage in stats.samples:
+            p50, p95 = stats.percentiles(stage, (50, 95))
+            parts.append(f"{label} {p50:.0f}/{p95:.0f}")
+    return " ".join(parts) + " ms" if parts else "-"
+
+
+# --- EVENT BUS ---
+# Newline-delimited compact JSON, one message per line:
+#   {"t":"frame","n":12,"ts":3.21,"hands":[[side,tilt,up_count,gap,rock]],
+#    "face":[mouth_ratio,eye_gap] or null,"keys":["W"]}
+#   {"t":"edge","n":13,"ts":3.21,"group":"left_rock","from":null,"to":"left_rock"}
+# n counts messages, so a subscriber can tell when it was too slow and some
+# were dropped. Features no bound rule uses are null.
+BUS_PORT = 47800
+BUS_HOSTS = ("", "127.0.0.1", "localhost")
+
+
+def bus_address(value):
+    # "name.sock" -> Unix socket (relative to BASE_DIR), "8765" or
+    # "localhost:port" -> TCP; TCP on BUS_PORT where Unix sockets do not
+    # exist. The bus is for local tools only, so TCP is always on 127.0.0.1
+    # and other hosts raise ValueError. -> (address family, address)
+    host, _, port = value.rpartition(":")
+    if port.isdigit():
+        if host not in BUS_HOSTS:
+            raise ValueError(f"event bus is local only, not on {host!r}")
+        return socket.AF_INET, ("127.0.0.1", int(port))
+    if not hasattr(socket, "AF_UNIX"):
+        return socket.AF_INET, ("127.0.0.1", BUS_PORT)
+    return socket.AF_UNIX, os.path.join(BASE_DIR, value)
+
+
+def rounded(value, digits=3):
+    return None if value is None else round(float(value), digits)
+
+
+def frame_message(ts, feats, keys):
+    hands = [
+        [h.side, rounded(h.tilt, 1), h.up_count, rounded(h.gap, 4), h.rock]
+        for h in feats.hands
+    ]
+    face = None
+    if feats.has_face:
+        face = [rounded(feats.mouth_ratio, 4), rounded(feats.eye_gap, 4)]
+    return {
+        "t": "frame",
+        "ts": round(ts, 4),
+        "hands": hands,
+        "face": face,
+        "keys": keys,
+    }
+
+
+class EventBus:
+    # Local fan-out of gesture messages to any number of subscribers. Every
+    # subscriber gets a bounded queue and its own sender thread; when its
+    # queue is full new messages are dropped for it alone, so a slow reader
+    # never holds up publish() and thereby the inference loop.
+    def __init__(self, value, depth=256):
+        self.value = value
+        self.depth = depth
+        self.family, self.address = bus_address(value)
+        server = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == socket.AF_INET:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        elif os.path.exists(self.address):
+            # Left over from a previous run, but never remove a regular file
+            if stat.S_ISSOCK(os.stat(self.address).st_mode):
+                os.unlink(self.address)
+        server.bind(self.address)
+        server.listen(8)
+        server.settimeout(0.5)  # lets the accept loop notice close()
+        self.server = server
+        self.lock = threading.Lock()
+        self.subscribers = {}  # connection -> message queue
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self):
+        while not self.closed:
+            try:
+                conn, _ = self.server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            conn.setblocking(True)
+            jobs = queue.Queue(maxsize=self.depth)
+            with self.lock:
+                self.subscribers[conn] = jobs
+            threading.Thread(
+                target=self._send_loop, args=(conn, jobs), daemon=True
+            ).start()
+
+    def _send_loop(self, conn, jobs):
+        try:
+            while True:
+                data = jobs.get()
+                if data is None:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass  # subscriber went away
+        finally:
+            with self.lock:
+                self.subscribers.pop(conn, None)
+            conn.close()
+
+    def publish(self, message):
+        with self.lock:
+            if not self.subscribers:
+                return
+            targets = list(self.subscribers.values())
+            message["n"] = self.sent
+            self.sent += 1
+        data = (json.dumps(message, separators=(",", ":")) + "\n").encode()
+        dropped = 0
+        for jobs in targets:
+            try:
+                jobs.put_nowait(data)
+            except queue.Full:
+                dropped += 1
+        if dropped:
+            with self.lock:
+                self.dropped += dropped
+
+    def publish_frame(self, ts, gestures):
+        # One frame record plus an edge message per group transition
+        if gestures.features is None:
+            return
+        self.publish(frame_message(ts, gestures.features, gestures.keys.active_keys))
+        for group, before, after in gestures.edges:
+            self.publish(
+                {
+                    "t": "edge",
+                    "ts": round(ts, 4),
+                    "group": group,
+                    "from": before,
+                    "to": after,
+                }
+            )
+
+    def summary(self):
+        with self.lock:
+            count = len(self.subscribers)
+        return f"{count} subs / {self.sent} sent / {self.dropped} drop"
+
+    def close(self):
+        self.closed = True
+        self.server.close()
+        with self.lock:
+            targets = list(self.subscribers.items())
+        for conn, jobs in targets:
+            try:
+                jobs.put_nowait(None)
+            except queue.Full:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)  # stuck reader, cut it off
+                except OSError:
+                    pass
+        if self.family != socket.AF_INET and os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+def listen_bus(value):
+    # Prints every message of a running instance's event bus
+    family, address = bus_address(value)
+    with socket.socket(family, socket.SOCK_STREAM) as conn:
+        conn.connect(address)
+        for line in conn.makefile("r", encoding="utf-8"):
+            print(line, end="", flush=True)
+
+
+# --- HUD RENDERING ---
+HUD_FONT = (cv2.FONT_HERSHEY_COMPLEX, 0.4)
+HUD_KEYS_FONT = (cv2.FONT_HERSHEY_SIMPLEX, 0.5)
+HUD_LINE_STEP = 22  # px between HUD lines, shrinking down to HUD_MIN_STEP
+HUD_MIN_STEP = 15
+HUD_KEYS_GAP = 24  # from the last HUD line to the ACTIVE KEYS line
+
+
+class HudRenderer:
+    # Draws the preview frame and HUD text into buffers allocated once. The
+    # finished RGBA image is double-buffered, so render() may run on a worker
+    # thread while the Tk thread pastes the front buffer into its PhotoImage.
+    # Only one render() runs at a time.
+    def __init__(self, size=(640, 360)):
+        w, h = size
+        self.size = size
+        self.bgr = np.empty((h, w, 3), np.uint8)
+        self.scaled = np.empty((h, w, 3), np.uint8)
+        self.buffers = [np.empty((h, w, 4), np.uint8) for _ in range(2)]
+        # RGBA images map their buffer, RGB ones would be copied
+        self.images = [
+            Image.frombuffer("RGBA", size, buf, "raw", "RGBA", 0, 1)
+            for buf in self.buffers
+        ]
+        self.front = 0
+        self.lock = threading.Lock()
+        self.render_lock = threading.Lock()
+        self.state = None  # what the front buffer shows
+        self.version = 0
+        self.shown = 0
+
+    def render(self, frame, seq, lines, keys_text, mirror=False):
+        with self.render_lock:
+            return self._render(frame, seq, lines, keys_text, mirror)
+
+    def _render(self, frame, seq, lines, keys_text, mirror):
+        # Skips the work if neither the frame nor any text has changed.
+        # mirror flips the small preview for frames captured unflipped.
+        state = (seq, lines, keys_text, mirror)
+        if state == self.state:
+            return False
+        bgr = self.bgr
+        if mirror:
+            cv2.resize(frame, self.size, dst=self.scaled)
+            cv2.flip(self.scaled, 1, dst=bgr)
+        else:
+            cv2.resize(frame, self.size, dst=bgr)
+        lines, step, right = self._layout(lines, keys_text)
+        keys_y = 25 + step * (len(lines) - 1) + HUD_KEYS_GAP
+        # Darken the HUD box in place, same as blending black at 40%
+        box = bgr[5 : keys_y + 8, 5:right]
+        cv2.convertScaleAbs(box, dst=box, alpha=0.6)
+
+        y = 25
+        for line in lines:
+            cv2.putText(bgr, line, (15, y), *HUD_FONT, (255, 255, 255), 1)
+            y += step
+        cv2.putText(bgr, keys_text, (15, keys_y), *HUD_KEYS_FONT, (0, 255, 255), 2)
+
+        back = 1 - self.front
+        cv2.cvtColor(bgr, cv2.COLOR_BGR2RGBA, dst=self.buffers[back])
+        with self.lock:
+            self.front = back
+            self.state = state
+            self.version += 1
+        return True
+
+    def _layout(self, lines, keys_text):
+        # -> (lines to draw, line spacing, right edge of the box). Lines move
+        # closer together when there are many, and the last ones are dropped
+        # once even that does not fit; lines wider than the frame are cut.
+        w, h = self.size
+        room = h - 8 - HUD_KEYS_GAP - 25  # first to last line baseline
+        n = len(lines)
+        step = HUD_LINE_STEP if n < 2 else min(HUD_LINE_STEP, room // (n - 1))
+        if step < HUD_MIN_STEP:
+            step = HUD_MIN_STEP
+            lines = lines[: room // step + 1]
+        widest = cv2.getTextSize(keys_text, *HUD_KEYS_FONT, 2)[0][0]
+        fitted = []
+        for line in lines:
+            width = cv2.getTextSize(line, *HUD_FONT, 1)[0][0]
+            while width > w - 30 and len(line) > 3:
+                line = line[: max(3, len(line) * (w - 30) // width - 2)] + ".."
+                width = cv2.getTextSize(line, *HUD_FONT, 1)[0][0]
+            fitted.append(line)
+            widest = max(widest, width)
+        return fitted, step, min(w - 5, 25 + widest)
+
+    def paste_into(self, photo):
+        # Copies the newest finished image into a Tk PhotoImage (Tk thread).
+        # -> seq of the frame it shows, None if there was nothing new
+        with self.lock:
+            if self.version == self.shown:
+                return None
+            photo.paste(self.images[self.front])
+            self.shown = self.version
+            return self.state[0]
 
 
 class GestureApp:
-    def __init__(self, window, window_title):
+    def __init__(self, window, window_title, record_path=None):
+        import_ui()
         self.window = window
         self.window.title(window_title)
         self.keyboard = Controller()
+        app_start = time.perf_counter()
 
-        self.current_frame = None
+        self.frames = FrameExchange()
+        self.recorder = LandmarkRecorder(record_path) if record_path else None
+        self.frame_stats = {"processed": 0, "skipped": 0}
+        # Preview side: camera frames shown again (new HUD text over the same
+        # frame) and frames published but never shown
+        self.display_stats = {"seq": 0, "again": 0, "unshown": 0}
         self.is_running = False
+        self.shown_running = False  # state the START/STOP button shows
         self.stop_threads = False
 
-        # Lock mechanisms
-        self.locks = {
-            "mouth": False,
-            "left_hand_macro": False,
-            "left_rock": False,
-            "right_rock": False,
-            "eye_blink": False,
-        }
-        self.active_keys = set()
+        self.gestures = GestureEngine(self.keyboard)
 
-        # HUD Status Information
-        self.hud_status = {
-            "Left Hand": "Passive",
-            "Right Hand": "Passive",
-            "Mouth": "Closed",
-            "Eye": "Open",
-            "Left Rock": "No",
-            "Right Rock": "No",
-        }
+        # HUD Status Information (gesture state comes from the engine)
+        self.hud_status = self.gestures.hud_status
+        self.hud_status["Frames"] = "-"
+        self.hud_status["Models"] = "-"
+        self.hud_status["Scale"] = "-"
+        self.hud_status["Rates"] = "-"
+        self.hud = HudRenderer()
+        self.hud_status["Latency"] = "off"
+        self.latency = LatencyStats(window=512)
+        self.latency_exporter = None
+        self.latency_shown = 0.0
+        self.hud_status["Camera"] = "-"
+        self.capture_stats = CaptureStats()
+        self.scaler = InferenceScaler()
+        self.bus = None  # opened and closed on the Tk thread only
+        self.bus_pending = None  # after() id of a delayed apply_event_bus
+        self.startup = StartupReport(self.hud_status)
+        self.startup.phases.append(("imports", (app_start - STARTED_AT) * 1000))
+        ui_start = self.startup.mark("app state", app_start)
+        # Shown until the camera delivers its first frame
+        self.blank = np.zeros((360, 640, 3), np.uint8)
 
         # --- PARAMETERS ---
-        self.vars = {
-            "threshold_mouth": tk.DoubleVar(value=0.20),
-            "threshold_eye": tk.DoubleVar(value=0.02),
-            "threshold_left_tilt_left": tk.DoubleVar(value=20.0),
-            "threshold_left_tilt_right": tk.DoubleVar(value=20.0),
-            "threshold_right_tilt_left": tk.DoubleVar(value=20.0),
-            "threshold_right_tilt_right": tk.DoubleVar(value=20.0),
-            "threshold_left_spread": tk.DoubleVar(value=0.085),
-            "threshold_right_gas_brake": tk.DoubleVar(value=0.045),
-            "threshold_rock_sens": tk.DoubleVar(value=0.05),
-            # Key Assignments
-            "key_mouth": tk.StringVar(value="g, end"),
-            "key_eye": tk.StringVar(value="g"),
-            "key_left_rock": tk.StringVar(value="alt+caps_lock"),
-            "key_right_rock": tk.StringVar(value="r"),
-            "key_left_spread": tk.StringVar(value="'"),
-            "key_left_closed": tk.StringVar(value="tab"),
-            "key_left_tilt_l": tk.StringVar(value="ctrl+tab"),
-            "key_left_tilt_r": tk.StringVar(value="e"),
-            "key_right_forward": tk.StringVar(value="w"),
-            "key_right_backward": tk.StringVar(value="s"),
-            "key_right_left": tk.StringVar(value="a"),
-            "key_right_right": tk.StringVar(value="d"),
-        }
-
+        self.vars = {name: make_var(v) for name, v in DEFAULT_SETTINGS.items()}
+        self.rule_specs = None  # default rules unless the file has its own
         self.load_settings()
-        self.vid = cv2.VideoCapture(0)
+        self.entries = {}
+        self.bindings = {}
+        for name in self.vars:
+            if name.startswith("key_"):
+                self.on_binding_edit(name)
+        self.settings = Settings(DEFAULT_SETTINGS, {}, [])
+        self.publish_settings()
+        for error in self.settings.rules.errors:
+            print(f"{SETTINGS_FILE}: {error}")
+        self.apply_event_bus()
 
-        self.vid.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        self.vid.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        self.mp_hands = mp.solutions.hands.Hands(
-            max_num_hands=2, min_detection_confidence=0.7, min_tracking_confidence=0.7
-        )
-        self.mp_face = mp.solutions.face_mesh.FaceMesh(refine_landmarks=True)
+        # The camera and the models come up on startup_sequence's thread, so
+        # the window shows right away. Inference either runs on a thread of
+        # this process or, to keep it off the UI's GIL, in a separate worker
+        # process; see load_models.
+        self.vid = None
+        self.engine = None
+        self.pipeline = None
+        self.model_lock = threading.Lock()
+        self.warm_started = None  # worker warm-up frame in flight
+        self.inference_fallback = False  # the worker process failed
 
         self.setup_ui()
 
+        # Every edit republishes the snapshot; bindings are recompiled only
+        # when their own entry changes
+        for name, var in self.vars.items():
+            var.trace_add("write", lambda *_, n=name: self.on_setting_edit(n))
+            if name.startswith("key_"):
+                # Entries exist now, flag bindings that were loaded malformed
+                self.on_binding_edit(name)
+
         self.cam_thread = threading.Thread(target=self.video_capture_loop, daemon=True)
         self.logic_thread = threading.Thread(
             target=self.logic_processing_loop, daemon=True
         )
-        self.cam_thread.start()
+        self.hud_thread = threading.Thread(target=self.hud_render_loop, daemon=True)
+        self.result_thread = None
+        self.startup_thread = threading.Thread(
+            target=self.startup_sequence, daemon=True
+        )
         self.logic_thread.start()
+        self.hud_thread.start()
+        self.startup_thread.start()
 
         self.update_canvas()
         self.window.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.startup.mark("window", ui_start)
 
-    def load_settings(self):
-        if os.path.exists(SETTINGS_FILE):
+    def startup_sequence(self):
+        # Camera first (the preview is what the user waits for), then the
+        # models if they are pre-warmed; otherwise START SYSTEM loads them
+        report = self.startup
+        vid = report.run("camera open", cv2.VideoCapture, 0)
+        report.run("camera setup", configure_capture, vid, self.settings)
+        self.vid = vid
+        self.cam_thread.start()
+        frame, _, _ = report.run("first frame", self.frames.wait_newer, 0, 5.0, False)
+        if frame is None:
+            self.hud_status["Startup"] = "no camera frames"
+            return
+        if self.settings.prewarm_models:
+            self.load_models(frame.shape)
+            if self.pipeline is None and self.engine is None:
+                return  # failed, shown on the HUD; START tries again
+        if self.warm_started is None:
+            self.startup_done()
+
+    def startup_done(self):
+        self.startup.ready()
+        if self.inference_fallback:
+            self.hud_status["Startup"] += " (in-thread, worker failed)"
+        print("Startup:\n" + self.startup.table())
+
+    def load_models(self, shape):
+        # Builds the inference side once, on whichever thread asks first.
+        # shape: camera frame shape, for the warm-up pass. -> False if it was
+        # already built or loading failed; the error is shown on the HUD
+        # Startup line and nothing is kept, so the next call tries again.
+        with self.model_lock:
+            if self.pipeline is not None or self.engine is not None:
+                return False
+            report = self.startup
+            opts = pipeline_options(self.settings, self.scaler.scale)
+            engine = pipeline = None
             try:
-                with open(SETTINGS_FILE, "r") as f:
-                    data = json.load(f)
-                    for k, v in data.items():
-                        if k in self.vars:
-                            self.vars[k].set(v)
-            except:
-                pass
+                if self.settings.inference_process and not self.inference_fallback:
+                    engine = InferenceProcess()
+                    report.run("inference process", engine.start)
+                    # The worker imports MediaPipe and builds its models on
+                    # the first job; the result loop reports when it comes back
+                    self.warm_started = time.perf_counter()
+                    warm = np.zeros(shape, np.uint8)
+                    engine.submit(warm, 0, self.warm_started, opts)
+                else:
+                    report.run("mediapipe import", load_mediapipe)
+                    pipeline = report.run(
+                        "models",
+                        LandmarkPipeline,
+                        "eye_gap" in self.settings.rules.features,
+                        self.settings.parallel_detectors,
+                        opts["backend"],
+                    )
+                    h, w = shape[:2]
+                    scale = opts["scale"]
+                    warm_shape = (max(1, int(h * scale)), max(1, int(w * scale)), 3)
+                    report.run("warm-up", pipeline.warm, warm_shape)
+            except Exception as e:
+                print(f"Loading models failed: {e}")
+                self.hud_status["Startup"] = f"models failed: {e}"
+                self.warm_started = None
+                if engine is not None:
+                    engine.stop()
+                if pipeline is not None:
+                    pipeline.close()
+                return False
+            if engine is not None:
+                self.engine = engine
+                self.result_thread = threading.Thread(
+                    target=self.inference_result_loop, args=(engine,), daemon=True
+                )
+                self.result_thread.start()
+            else:
+                self.pipeline = pipeline
+            return True
+
+    def load_settings(self):
+        data = read_settings_file(SETTINGS_FILE)
+        for k, v in data.items():
+            if k in self.vars:
+                self.vars[k].set(v)
+        if isinstance(data.get("rules"), list):
+            self.rule_specs = data["rules"]
 
     def save_settings(self):
-        data = {k: v.get() for k, v in self.vars.items()}
+        data = dict(self.settings.values)
+        if self.rule_specs is not None:
+            data["rules"] = self.rule_specs
         with open(SETTINGS_FILE, "w") as f:
             json.dump(data, f)
         messagebox.showinfo("PhantomCast", "Settings Saved Successfully!")
 
     def setup_ui(self):
+        ttk.Style().configure("Invalid.TEntry", foreground="#c0392b")
+
         # --- CAMERA UI ---
         self.canvas = tk.Canvas(self.window, width=640, height=360, bg="#111")
         self.canvas.pack(side=tk.TOP, pady=10)
+        # One image item for the whole session; frames are pasted into it
+        self.photo = ImageTk.PhotoImage("RGBA", self.hud.size)
+        self.canvas.create_image(320, 180, image=self.photo)
 
         # --- SETTINGS PANEL ---
         container = ttk.Frame(self.window)
@@ -177,6 +2778,9 @@ class GestureApp:
         self.create_slider(
             "➡️ Right Hand / Tilt Right", self.vars["threshold_right_tilt_right"], 5, 60
         )
+        self.create_slider(
+            "↔️ Tilt Hysteresis (degree)", self.vars["tilt_hysteresis"], 0, 10
+        )
 
         ttk.Label(
             self.panel, text="--- HAND & ROCK GESTURE ---", font=("Arial", 8, "bold")
@@ -190,10 +2794,83 @@ class GestureApp:
             0.02,
             0.10,
         )
+        self.create_slider(
+            "⛽ Gas/Brake Hysteresis", self.vars["gap_hysteresis"], 0, 0.02
+        )
         self.create_slider(
             "🤘 Rock Gesture Sens.", self.vars["threshold_rock_sens"], 0.01, 0.15
         )
 
+        ttk.Label(
+            self.panel, text="--- PERFORMANCE ---", font=("Arial", 8, "bold")
+        ).pack(pady=5)
+        self.create_check(
+            "⚡ Run Hand & Face Models in Parallel", self.vars["parallel_detectors"]
+        )
+        self.create_check(
+            "🧩 Run Inference in a Separate Process (restart)",
+            self.vars["inference_process"],
+        )
+        self.create_slider(
+            "🔍 Inference Resolution Scale", self.vars["inference_scale"], 0.25, 1.0
+        )
+        self.create_check(
+            "🎯 Auto Scale to Latency Budget", self.vars["inference_auto"]
+        )
+        self.create_slider(
+            "⏱️ Latency Budget (ms)", self.vars["latency_budget_ms"], 10, 60
+        )
+        self.create_check("🙂 Track Face Region (crop)", self.vars["face_roi"])
+        self.create_check(
+            "🪞 Mirror Landmarks Instead of Frames", self.vars["mirror_landmarks"]
+        )
+        self.create_check(
+            "📷 Always Take the Newest Camera Frame", self.vars["camera_grab_latest"]
+        )
+        self.create_check("🎞️ Camera MJPG Format (restart)", self.vars["camera_mjpg"])
+        self.create_slider("🎞️ Camera FPS (restart)", self.vars["camera_fps"], 15, 60)
+        self.create_slider(
+            "📥 Camera Buffer Frames (restart)", self.vars["camera_buffer_size"], 1, 4
+        )
+        self.create_check("🪶 Smooth Hand Features", self.vars["smooth_features"])
+        self.create_check(
+            "🔮 Predict Hands Between Model Runs", self.vars["predict_features"]
+        )
+        self.create_check("📊 Latency Stats on HUD", self.vars["latency_stats"])
+        self.create_input(
+            "📄 Latency Export File (.csv or .prom)", self.vars["latency_export"]
+        )
+        self.create_check(
+            "🖼️ Render Preview on a Worker Thread", self.vars["hud_worker"]
+        )
+        self.create_check("⌨️ Send Keys on a Worker Thread", self.vars["async_keys"])
+        self.create_check(
+            "🔥 Load Models at Startup (else on START)", self.vars["prewarm_models"]
+        )
+        self.create_input(
+            "🧠 Detector Backend: auto / tasks / legacy (restart)",
+            self.vars["detector_backend"],
+        )
+        self.create_input(
+            "✋ Hand Model File (tasks, restart)", self.vars["hand_model"]
+        )
+        self.create_input(
+            "🙂 Face Model File (tasks, restart)", self.vars["face_model"]
+        )
+        self.create_check(
+            "⏩ Don't Wait for Tasks Results (pipelined)", self.vars["tasks_pipelined"]
+        )
+        self.create_input(
+            "📡 Event Bus Socket (name.sock or port, empty = off)",
+            self.vars["event_bus"],
+        )
+        self.create_slider(
+            "✋ Run Hand Model Every N Frames", self.vars["hands_interval"], 1, 4
+        )
+        self.create_slider(
+            "🙂 Run Face Model Every N Frames", self.vars["face_interval"], 1, 4
+        )
+
         ttk.Separator(self.panel, orient="horizontal").pack(fill=tk.X, pady=10)
         ttk.Label(
             self.panel, text="--- KEY ASSIGNMENTS ---", font=("Arial", 8, "bold")
@@ -236,42 +2913,41 @@ class GestureApp:
         self.btn_toggle.pack(fill=tk.X, pady=15)
 
     def update_canvas(self):
-        if self.current_frame is not None:
-            display_frame = cv2.resize(self.current_frame, (640, 360))
-
-            overlay = display_frame.copy()
-            cv2.rectangle(overlay, (5, 5), (280, 180), (0, 0, 0), -1)
-            cv2.addWeighted(overlay, 0.4, display_frame, 0.6, 0, display_frame)
-
-            y = 25
-            for label, status in self.hud_status.items():
-                cv2.putText(
-                    display_frame,
-                    f"{label}: {status}",
-                    (15, y),
-                    cv2.FONT_HERSHEY_COMPLEX,
-                    0.4,
-                    (255, 255, 255),
-                    1,
-                )
-                y += 22
-
-            status_text = "ACTIVE KEYS: " + " + ".join(list(self.active_keys))
-            cv2.putText(
-                display_frame,
-                status_text,
-                (15, 345),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (0, 255, 255),
-                2,
-            )
-
-            img = Image.fromarray(cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB))
-            self.photo = ImageTk.PhotoImage(image=img)
-            self.canvas.create_image(320, 180, image=self.photo)
+        if not self.settings.hud_worker:
+            frame, seq, _ = self.frames.latest(hold=True)
+            self.render_hud(self.blank if frame is None else frame, seq)
+            self.frames.release(frame)
+        shown = self.hud.paste_into(self.photo)
+        if shown:
+            self.count_shown(shown)
+        if self.shown_running != self.is_running:
+            self.show_running()
         self.window.after(15, self.update_canvas)
 
+    def render_hud(self, frame, seq):
+        lines = tuple(
+            f"{label}: {status}" for label, status in list(self.hud_status.items())
+        )
+        keys_text = "ACTIVE KEYS: " + " + ".join(self.gestures.keys.active_keys)
+        self.hud.render(frame, seq, lines, keys_text, self.settings.mirror_landmarks)
+
+    def hud_render_loop(self):
+        # Resize and colour conversion off the Tk thread when hud_worker is on.
+        # A timeout re-renders the last frame in case only the HUD changed.
+        last_seq = 0
+        while not self.stop_threads:
+            if not self.settings.hud_worker:
+                time.sleep(0.1)
+                continue
+            frame, seq, _ = self.frames.wait_newer(
+                last_seq, timeout=0.05, consume=False, hold=True
+            )
+            if frame is None:
+                frame, seq, _ = self.frames.latest(hold=True)
+            self.render_hud(self.blank if frame is None else frame, seq)
+            self.frames.release(frame)
+            last_seq = seq
+
     def create_slider(self, text, var, start, end):
         f = ttk.Frame(self.panel)
         f.pack(fill=tk.X)
@@ -280,282 +2956,244 @@ class GestureApp:
             fill=tk.X
         )
 
-    def create_input(self, text, var, parent=None, side=tk.TOP):
+    def create_check(self, text, var):
+        f = ttk.Frame(self.panel)
+        f.pack(fill=tk.X)
+        ttk.Checkbutton(f, text=text, variable=var).pack(anchor=tk.W)
+
+    def create_input(self, text, var, parent=None, side="top"):
         target = parent if parent else self.panel
         f = ttk.Frame(target)
         f.pack(side=side, fill=tk.X, expand=True)
         ttk.Label(f, text=text, font=("Arial", 7)).pack(anchor=tk.W)
-        ttk.Entry(f, textvariable=var, font=("Arial", 8)).pack(fill=tk.X)
+        entry = ttk.Entry(f, textvariable=var, font=("Arial", 8))
+        entry.pack(fill=tk.X)
+        self.entries[str(var)] = entry
+
+    def on_setting_edit(self, name):
+        if name.startswith("key_"):
+            self.on_binding_edit(name)
+        self.publish_settings()
+        if name == "event_bus":
+            # Applied once typing pauses, not on every keystroke
+            if self.bus_pending is not None:
+                self.window.after_cancel(self.bus_pending)
+            self.bus_pending = self.window.after(1000, self.apply_event_bus)
+
+    def apply_event_bus(self):
+        # Opens, moves or closes the event bus to match the setting. Runs on
+        # the Tk thread; the inference loop only publishes to self.bus.
+        self.bus_pending = None
+        value = self.settings.event_bus.strip()
+        bus = self.bus
+        if bus is not None and bus.value == value:
+            return
+        if bus is not None:
+            self.bus = None
+            bus.close()
+            self.hud_status.pop("Bus", None)
+        if value:
+            try:
+                self.bus = EventBus(value)
+            except (OSError, ValueError) as e:
+                print(f"Event bus {value!r}: {e}")
+
+    def publish_settings(self):
+        values = dict(self.settings.values)
+        for name, var in self.vars.items():
+            try:
+                values[name] = var.get()
+            except tk.TclError:
+                pass  # half-typed number, keep the previous value
+        self.settings = Settings(values, self.bindings, self.rule_specs)
+        self.gestures.settings = self.settings
+
+    def on_binding_edit(self, name):
+        # A malformed binding keeps the last good one and marks the entry red
+        var = self.vars[name]
+        try:
+            self.bindings[name] = compile_binding(var.get())
+            style = "TEntry"
+        except ValueError:
+            self.bindings.setdefault(name, ())
+            style = "Invalid.TEntry"
+        entry = self.entries.get(str(var))
+        if entry is not None:
+            entry.configure(style=style)
 
     def video_capture_loop(self):
         while not self.stop_threads:
-            ret, frame = self.vid.read()
-            if ret:
-                self.current_frame = cv2.flip(frame, 1)
-            time.sleep(0.01)
-
-    def is_rock_gesture(self, lm):
-        # Index (8) and Pinky (20) must be UP
-        # Middle (12) and Ring (16) must be DOWN
-        index_up = lm[8].y < lm[6].y
-        pinky_up = lm[20].y < lm[18].y
-        middle_down = lm[12].y > lm[10].y
-        ring_down = lm[16].y > lm[14].y
-        return index_up and pinky_up and middle_down and ring_down
+            # Blocks on the camera, no sleep needed between frames
+            frame, skipped = capture_frame(self.vid, self.settings, self.frames.pool)
+            if frame is None:
+                time.sleep(0.01)
+                continue
+            self.frames.publish(frame)
+            self.hud_status["Camera"] = self.capture_stats.add(
+                frame_age_ms(self.vid), skipped
+            )
 
     def logic_processing_loop(self):
+        last_seq = 0
         while not self.stop_threads:
-            if self.is_running and self.current_frame is not None:
-                rgb = cv2.cvtColor(self.current_frame, cv2.COLOR_BGR2RGB)
-                hand_res = self.mp_hands.process(rgb)
-                face_res = self.mp_face.process(rgb)
-
-                # --- FACE LOGIC ---
-                if face_res.multi_face_landmarks:
-                    m = face_res.multi_face_landmarks[0].landmark
-                    mouth_ratio = abs(m[13].y - m[14].y) / abs(m[10].y - m[152].y)
-                    if mouth_ratio > self.vars["threshold_mouth"].get():
-                        self.hud_status["Mouth"] = "OPEN"
-                        if not self.locks["mouth"]:
-                            for s in self.vars["key_mouth"].get().split(","):
-                                self.handle_keys(s.strip(), True)
-                                self.handle_keys(s.strip(), False)
-                            self.locks["mouth"] = True
-                    else:
-                        self.hud_status["Mouth"] = "Closed"
-                        self.locks["mouth"] = False
-
-                    avg_eye_gap = (
-                        abs(m[159].y - m[145].y) + abs(m[386].y - m[374].y)
-                    ) / 2
-                    if avg_eye_gap < self.vars["threshold_eye"].get():
-                        self.hud_status["Eye"] = "BLINK"
-                        if not self.locks["eye_blink"]:
-                            for s in self.vars["key_eye"].get().split(","):
-                                self.handle_keys(s.strip(), True)
-                                self.handle_keys(s.strip(), False)
-                            self.locks["eye_blink"] = True
-                    else:
-                        self.hud_status["Eye"] = "Open"
-                        self.locks["eye_blink"] = False
-
-                # --- HAND LOGIC ---
-                active_this_frame = {"Left": False, "Right": False}
-                if hand_res.multi_hand_landmarks:
-                    for idx, hand_lms in enumerate(hand_res.multi_hand_landmarks):
-                        side = hand_res.multi_handedness[idx].classification[0].label
-                        lm = hand_lms.landmark
-                        angle = math.degrees(
-                            math.atan2(lm[9].x - lm[0].x, -(lm[9].y - lm[0].y))
-                        )
-                        active_this_frame[side] = True
-
-                        if side == "Left":
-                            # Left Hand Tilt
-                            l_tilt_l = self.vars["threshold_left_tilt_left"].get()
-                            l_tilt_r = self.vars["threshold_left_tilt_right"].get()
-                            if angle < -l_tilt_l:
-                                self.handle_keys(
-                                    self.vars["key_left_tilt_l"].get(), True
-                                )
-                                self.handle_keys(
-                                    self.vars["key_left_tilt_r"].get(), False
-                                )
-                                self.hud_status["Left Hand"] = f"LEFT ({int(angle)}°)"
-                            elif angle > l_tilt_r:
-                                self.handle_keys(
-                                    self.vars["key_left_tilt_r"].get(), True
-                                )
-                                self.handle_keys(
-                                    self.vars["key_left_tilt_l"].get(), False
-                                )
-                                self.hud_status["Left Hand"] = f"RIGHT ({int(angle)}°)"
-                            else:
-                                self.handle_keys(
-                                    self.vars["key_left_tilt_l"].get(), False
-                                )
-                                self.handle_keys(
-                                    self.vars["key_left_tilt_r"].get(), False
-                                )
-                                self.hud_status["Left Hand"] = "CENTER"
-
-                            # ROCK GESTURE (Left)
-                            if self.is_rock_gesture(lm):
-                                self.hud_status["Left Rock"] = "YES 🤘"
-                                if not self.locks["left_rock"]:
-                                    for s in (
-                                        self.vars["key_left_rock"].get().split(",")
-                                    ):
-                                        self.handle_keys(s.strip(), True)
-                                        self.handle_keys(s.strip(), False)
-                                    self.locks["left_rock"] = True
-                            else:
-                                self.hud_status["Left Rock"] = "No"
-                                self.locks["left_rock"] = False
-
-                            # Finger Macro (Spread/Closed)
-                            f_up = sum([lm[i].y < lm[i - 2].y for i in [8, 12, 16, 20]])
-                            if f_up >= 3:
-                                gap = math.sqrt(
-                                    (lm[8].x - lm[12].x) ** 2
-                                    + (lm[8].y - lm[12].y) ** 2
-                                )
-                                if not self.locks["left_hand_macro"]:
-                                    m_str = (
-                                        self.vars["key_left_spread"].get()
-                                        if gap
-                                        > self.vars["threshold_left_spread"].get()
-                                        else self.vars["key_left_closed"].get()
-                                    )
-                                    for s in m_str.split(","):
-                                        self.handle_keys(s.strip(), True)
-                                        self.handle_keys(s.strip(), False)
-                                    self.locks["left_hand_macro"] = True
-                            else:
-                                self.locks["left_hand_macro"] = False
-
-                        elif side == "Right":
-                            # Right Hand Tilt
-                            r_tilt_l = self.vars["threshold_right_tilt_left"].get()
-                            r_tilt_r = self.vars["threshold_right_tilt_right"].get()
-                            if angle < -r_tilt_l:
-                                self.handle_keys(
-                                    self.vars["key_right_left"].get(), True
-                                )
-                                self.handle_keys(
-                                    self.vars["key_right_right"].get(), False
-                                )
-                                self.hud_status["Right Hand"] = f"LEFT ({int(angle)}°)"
-                            elif angle > r_tilt_r:
-                                self.handle_keys(
-                                    self.vars["key_right_right"].get(), True
-                                )
-                                self.handle_keys(
-                                    self.vars["key_right_left"].get(), False
-                                )
-                                self.hud_status["Right Hand"] = f"RIGHT ({int(angle)}°)"
-                            else:
-                                self.handle_keys(
-                                    self.vars["key_right_left"].get(), False
-                                )
-                                self.handle_keys(
-                                    self.vars["key_right_right"].get(), False
-                                )
-                                self.hud_status["Right Hand"] = "CENTER"
-
-                            # ROCK GESTURE (Right)
-                            if self.is_rock_gesture(lm):
-                                self.hud_status["Right Rock"] = "YES 🤘"
-                                if not self.locks["right_rock"]:
-                                    for s in (
-                                        self.vars["key_right_rock"].get().split(",")
-                                    ):
-                                        self.handle_keys(s.strip(), True)
-                                        self.handle_keys(s.strip(), False)
-                                    self.locks["right_rock"] = True
-                            else:
-                                self.hud_status["Right Rock"] = "No"
-                                self.locks["right_rock"] = False
-
-                            # Gas/Brake (Gap based)
-                            gap_ws = math.sqrt(
-                                (lm[8].x - lm[12].x) ** 2 + (lm[8].y - lm[12].y) ** 2
-                            )
-                            if (
-                                sum([lm[i].y < lm[i - 2].y for i in [8, 12, 16, 20]])
-                                >= 3
-                            ):
-                                if (
-                                    gap_ws
-                                    > self.vars["threshold_right_gas_brake"].get()
-                                ):
-                                    self.handle_keys(
-                                        self.vars["key_right_forward"].get(), True
-                                    )
-                                    self.handle_keys(
-                                        self.vars["key_right_backward"].get(), False
-                                    )
-                                else:
-                                    self.handle_keys(
-                                        self.vars["key_right_backward"].get(), True
-                                    )
-                                    self.handle_keys(
-                                        self.vars["key_right_forward"].get(), False
-                                    )
-                            else:
-                                self.handle_keys(
-                                    self.vars["key_right_forward"].get(), False
-                                )
-                                self.handle_keys(
-                                    self.vars["key_right_backward"].get(), False
-                                )
-
-                if not active_this_frame["Left"]:
-                    self.hud_status["Left Hand"] = "Passive"
-                    self.hud_status["Left Rock"] = "Passive"
-                if not active_this_frame["Right"]:
-                    self.hud_status["Right Hand"] = "Passive"
-                    self.hud_status["Right Rock"] = "Passive"
-
-            time.sleep(0.01)
-
-    def handle_keys(self, key_str, press=True):
-        if not key_str:
-            return
-        for combo in key_str.split(","):
-            parts = combo.strip().replace(" ", "").split("+")
-            keys = []
-            for p in parts:
-                p = p.lower()
-                # Expanded special keys mapping
-                spec = {
-                    "ctrl": Key.ctrl,
-                    "shift": Key.shift,
-                    "alt": Key.alt,
-                    "tab": Key.tab,
-                    "space": Key.space,
-                    "end": Key.end,
-                    "caps_lock": Key.caps_lock,
-                    "capslock": Key.caps_lock,
-                    "esc": Key.esc,
-                    "enter": Key.enter,
-                }
-                keys.append(spec.get(p, p))
-
-            target = keys if press else reversed(keys)
-            for k in target:
+            frame, seq, ts = self.frames.wait_newer(last_seq, 0.1, hold=True)
+            if frame is None:
+                continue
+            if self.is_running and self.pipeline is None and self.engine is None:
+                built = self.load_models(frame.shape)
+                if self.pipeline is None and self.engine is None:
+                    self.is_running = False  # the next START tries again
+                elif built and self.warm_started is None:
+                    self.startup_done()
+            # The result thread drops the engine if the worker fails
+            engine, pipeline = self.engine, self.pipeline
+            if self.is_running and (engine is not None or pipeline is not None):
+                self.count_frame(last_seq, seq)
+                opts = pipeline_options(self.settings, self.scaler.scale)
+                out = None
                 try:
-                    if press:
-                        self.keyboard.press(k)
-                        self.active_keys.add(str(k).replace("Key.", "").upper())
+                    if engine is not None:
+                        engine.submit(frame, seq, ts, opts, timeout=0.5)
                     else:
-                        self.keyboard.release(k)
-                        kn = str(k).replace("Key.", "").upper()
-                        if kn in self.active_keys:
-                            self.active_keys.remove(kn)
-                except:
-                    pass
+                        out, timings = pipeline.run(frame, ts, opts)
+                except InferenceError as e:
+                    self.inference_failed(engine, e)
+                finally:
+                    # Copied to the worker or converted, capture may reuse it
+                    self.frames.release(frame)
+                if out is not None:
+                    sides, hand_lms = out["hands"]
+                    hud = pipeline.hud()
+                    self.on_result(ts, sides, hand_lms, out["face"], hud, timings)
+            else:
+                self.frames.release(frame)
+            last_seq = seq
+
+    def inference_result_loop(self, engine):
+        while not self.stop_threads and self.engine is engine:
+            try:
+                res = engine.get_result()
+            except InferenceError as e:
+                if e.station is None or self.warm_started is not None:
+                    self.inference_failed(engine, e)
+                else:
+                    self.hud_status["Models"] = f"error: {e}"
+                continue
+            if res is None:
+                continue
+            if self.warm_started is not None:
+                self.startup.mark("worker models", self.warm_started)
+                self.warm_started = None
+                self.startup_done()
+                continue
+            if self.is_running:
+                self.on_result(*res[2:])
+
+    def inference_failed(self, engine, error):
+        # The worker process died or could not build its models. Inference
+        # moves to this process: the logic thread loads the models here on
+        # its next frame, or on the next START.
+        with self.model_lock:
+            if self.engine is not engine:
+                return
+            self.engine = None
+            self.warm_started = None
+            self.inference_fallback = True
+        print(f"Inference process failed ({error}), running inference in-thread")
+        self.hud_status["Startup"] = f"worker failed ({error}), in-thread"
+        engine.stop()
+
+    def on_result(self, ts, sides, hand_lms, face, hud, timings):
+        self.scaler.update(timings["convert"] + timings["detect"], self.settings)
+        self.hud_status.update(hud)
+        self.hud_status["Scale"] = self.scaler.summary()
+        if not self.settings.latency_stats:
+            timings = None
+        self.on_landmarks(ts, sides, hand_lms, face, timings)
+
+    def on_landmarks(self, ts, sides, hands, face, timings=None):
+        # timings: stage -> ms for this frame, None when stats are off
+        if self.settings.mirror_landmarks:
+            sides, hands, face = mirror_landmarks(sides, hands, face)
+        if self.recorder is not None:
+            self.recorder.write(ts, sides, hands, face)
+        start = time.perf_counter()
+        self.gestures.apply(sides, hands, face, ts)
+        if timings is not None:
+            self.record_latency(ts, start, timings)
+        else:
+            self.hud_status["Latency"] = "off"
+        self.publish_events(ts)
+
+    def publish_events(self, ts):
+        bus = self.bus
+        if bus is not None:
+            bus.publish_frame(ts, self.gestures)
+            if self.bus is bus:  # not closed meanwhile
+                self.hud_status["Bus"] = bus.summary()
+
+    def record_latency(self, ts, logic_start, timings):
+        now = add_frame_latency(
+            self.latency, self.gestures.keys, ts, logic_start, timings
+        )
+
+        if now - self.latency_shown >= 0.5:
+            self.latency_shown = now
+            self.hud_status["Latency"] = latency_summary(self.latency)
+        path = self.settings.latency_export.strip()
+        if not path:
+            self.latency_exporter = None
+        elif self.latency_exporter is None or self.latency_exporter.path != path:
+            self.latency_exporter = LatencyExporter(path)
+        if self.latency_exporter is not None:
+            self.latency_exporter.maybe_write(self.latency)
+
+    def count_frame(self, last_seq, seq):
+        # A gap in sequence numbers means the camera outran inference
+        stats = self.frame_stats
+        if last_seq:
+            stats["skipped"] += seq - last_seq - 1
+        stats["processed"] += 1
+        shown = self.display_stats
+        self.hud_status["Frames"] = (
+            f"{stats['processed']} ok / {self.frames.dropped} drop"
+            f" / {self.frames.pool.allocated} bufs | view {shown['unshown']} miss"
+            f" / {shown['again']} again"
+        )
+
+    def count_shown(self, seq):
+        # Same bookkeeping for the preview, on the Tk thread
+        stats = self.display_stats
+        last = stats["seq"]
+        if seq == last:
+            stats["again"] += 1
+        elif last:
+            stats["unshown"] += max(0, seq - last - 1)
+        stats["seq"] = seq
 
     def toggle_system(self):
         self.is_running = not self.is_running
+        self.show_running()
+        if not self.is_running:
+            self.gestures.keys.release_held()
+            self.gestures.keys.flush()
+            self.release_all()
+
+    def show_running(self):
+        # Also called from update_canvas when a worker thread stopped the
+        # system, e.g. because the models failed to load
+        self.shown_running = self.is_running
         self.btn_toggle.config(
             text="STOP SYSTEM" if self.is_running else "START SYSTEM",
             bg="#c0392b" if self.is_running else "#27ae60",
         )
-        if not self.is_running:
-            self.release_all()
-            self.active_keys.clear()
 
     def release_all(self):
         # Emergency release for all possible mapped keys
-        keys = [
-            Key.ctrl,
-            Key.shift,
-            Key.alt,
-            Key.tab,
-            Key.space,
-            Key.end,
-            Key.caps_lock,
+        names = key_names()
+        special = ("ctrl", "shift", "alt", "tab", "space", "end", "caps_lock")
+        keys = binding_keys(self.settings.bindings.values())
+        keys += [names[k] for k in special if k in names] + [
             "w",
             "a",
             "s",
@@ -569,17 +3207,565 @@ class GestureApp:
         for k in keys:
             try:
                 self.keyboard.release(k)
-            except:
+            except Exception:
                 pass
 
     def on_closing(self):
         self.stop_threads = True
-        self.vid.release()
+        self.frames.close()
+        self.logic_thread.join(timeout=1.0)
+        self.hud_thread.join(timeout=1.0)
+        with self.model_lock:
+            if self.engine is not None:
+                self.result_thread.join(timeout=1.0)
+                self.engine.stop()
+            elif self.pipeline is not None:
+                self.pipeline.close()
+        self.gestures.keys.release_held()
+        self.gestures.keys.close()
+        print(
+            "Frames: capture dropped {}, inference processed {}, skipped {};"
+            " preview missed {}, showed again {}".format(
+                self.frames.dropped,
+                self.frame_stats["processed"],
+                self.frame_stats["skipped"],
+                self.display_stats["unshown"],
+                self.display_stats["again"],
+            )
+        )
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.bus is not None:
+            self.bus.close()
+        if self.vid is not None:
+            self.cam_thread.join(timeout=1.0)
+            self.vid.release()
         self.window.destroy()
 
 
+# --- MULTI-STATION ---
+class Station:
+    # One camera with its own settings profile, gesture state and stats
+    def __init__(self, index, name, source, settings, keyboard):
+        self.index = index
+        self.name = name
+        self.source = source
+        self.settings = settings
+        self.frames = FrameExchange()
+        self.gestures = GestureEngine(keyboard, settings)
+        self.scaler = InferenceScaler()
+        self.capture_stats = CaptureStats()
+        self.latency = LatencyStats(window=512)
+        self.status = "starting"
+        self.camera = "-"
+        self.processed = 0
+        self.errors = 0  # inference jobs that failed
+        self.fps = 0.0
+        self.window_count = 0
+        self.window_start = time.perf_counter()
+
+    def on_result(self, ts, sides, hands, face, hud, timings, emit=True):
+        cfg = self.settings
+        self.scaler.update(timings["convert"] + timings["detect"], cfg)
+        if cfg.mirror_landmarks:
+            sides, hands, face = mirror_landmarks(sides, hands, face)
+        start = time.perf_counter()
+        if emit:
+            self.gestures.apply(sides, hands, face, ts)
+        now = add_frame_latency(self.latency, self.gestures.keys, ts, start, timings)
+
+        self.processed += 1
+        self.window_count += 1
+        elapsed = now - self.window_start
+        if elapsed >= 1.0:
+            self.fps = self.window_count / elapsed
+            self.window_count = 0
+            self.window_start = now
+
+
+def read_station_list(path, keyboard_factory=None):
+    # JSON list of {"name": ..., "source": "0" or a video file, "settings":
+    # profile file}; profile paths are relative to the list file. Keys go to
+    # pynput unless keyboard_factory says otherwise.
+    if keyboard_factory is None:
+        import_ui()
+        keyboard_factory = Controller
+    with open(path) as f:
+        entries = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    stations = []
+    for i, entry in enumerate(entries):
+        profile = entry.get("settings")
+        if profile:
+            settings = Settings.load(os.path.join(base, profile))
+        else:
+            settings = Settings.from_dict({})
+        name = entry.get("name", f"Station {i + 1}")
+        source = str(entry.get("source", i))
+        stations.append(Station(i, name, source, settings, keyboard_factory()))
+    return stations
+
+
+class StationPool:
+    # Runs several stations on a shared pool of inference processes, one per
+    # core at most. A station is pinned to one worker, which keeps that
+    # camera's MediaPipe graphs and tracking state; with more stations than
+    # cores a worker serves several of them in turn.
+    def __init__(self, stations, workers=0):
+        self.stations = stations
+        count = workers or min(os.cpu_count() or 1, len(stations))
+        self.workers = [InferenceProcess() for _ in range(count)]
+        self.emit = False  # whether gestures reach the keyboards
+        self.stop_threads = False
+        self.threads = []
+
+    def worker_of(self, station):
+        return station.index % len(self.workers)
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+        loops = [(self._capture_loop, st) for st in self.stations]
+        loops += [(self._submit_loop, st) for st in self.stations]
+        loops += [(self._result_loop, worker) for worker in self.workers]
+        for target, arg in loops:
+            t = threading.Thread(target=target, args=(arg,), daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def _capture_loop(self, station):
+        vid = open_source(station.source)
+        if not vid.isOpened():
+            station.status = "no source"
+            station.frames.close()
+            return
+        cfg = station.settings
+        camera = str(station.source).isdigit()
+        if camera:
+            configure_capture(vid, cfg)
+        # Files are paced at their own frame rate, as a camera would deliver
+        interval = 0.0 if camera else 1.0 / (vid.get(cv2.CAP_PROP_FPS) or 30.0)
+        next_at = time.perf_counter()
+        station.status = "running"
+        try:
+            while not self.stop_threads:
+                frame, skipped = capture_frame(vid, cfg, station.frames.pool, camera)
+                if frame is None:
+                    if not camera:
+                        if station.status == "running":
+                            station.status = "finished"
+                        break
+                    time.sleep(0.01)
+                    continue
+                station.frames.publish(frame)
+                age = frame_age_ms(vid) if camera else None
+                station.camera = station.capture_stats.add(age, skipped)
+                if interval:
+                    next_at += interval
+                    time.sleep(max(0.0, next_at - time.perf_counter()))
+        finally:
+            vid.release()
+            station.frames.close()
+
+    def _submit_loop(self, station):
+        worker = self.workers[self.worker_of(station)]
+        last_seq = 0
+        while not self.stop_threads and not station.frames.closed:
+            frame, seq, ts = station.frames.wait_newer(last_seq, 0.1, hold=True)
+            if frame is None:
+                continue
+            last_seq = seq
+            opts = pipeline_options(station.settings, station.scaler.scale)
+            try:
+                worker.submit(frame, seq, ts, opts, timeout=0.5, station=station.index)
+            except InferenceError:
+                return  # the result loop reports it
+            finally:
+                station.frames.release(frame)
+
+    def _result_loop(self, worker):
+        while not self.stop_threads:
+            try:
+                res = worker.get_result()
+            except InferenceError as e:
+                if e.station is not None:
+                    station = self.stations[e.station]
+                    station.errors += 1
+                    if station.errors == 1:
+                        print(f"{station.name}: inference failed: {e}")
+                    continue
+                print(f"Inference worker {self.workers.index(worker) + 1}: {e}")
+                for st in self.stations:
+                    if self.workers[self.worker_of(st)] is worker:
+                        st.status = "worker died"
+                return
+            if res is not None:
+                self.stations[res[0]].on_result(*res[2:], emit=self.emit)
+
+    def set_emit(self, emit):
+        self.emit = emit
+        if not emit:
+            for st in self.stations:
+                st.gestures.keys.release_held()
+
+    def rows(self):
+        # -> [(index, name, column values)] for the supervisor and reports
+        rows = []
+        for st in self.stations:
+            cells = []
+            for stage in ("detect", "e2e"):
+                if stage in st.latency.samples:
+                    p50, p95 = st.latency.percentiles(stage, (50, 95))
+                    cells.append(f"{p50:.0f}/{p95:.0f} ms")
+                else:
+                    cells.append("-")
+            values = (
+                st.source,
+                self.worker_of(st) + 1,
+                st.status,
+                st.camera,
+                f"{st.fps:.1f}",
+                *cells,
+                st.gestures.keys.emitted,
+                st.errors,
+            )
+            rows.append((st.index, st.name, values))
+        return rows
+
+    def stop(self):
+        self.stop_threads = True
+        for st in self.stations:
+            st.frames.close()
+        for t in self.threads:
+            t.join(timeout=1.0)
+        for worker in self.workers:
+            worker.stop()
+        self.set_emit(False)
+        for st in self.stations:
+            st.gestures.keys.close()
+
+
+class StationSupervisor:
+    # One window for every station of a StationPool. Inference runs as soon
+    # as it opens; keys are only sent while output is started.
+    COLUMNS = (
+        ("source", "Source", 80),
+        ("worker", "Worker", 50),
+        ("status", "Status", 70),
+        ("camera", "Camera", 190),
+        ("fps", "Inference fps", 80),
+        ("detect", "Detect p50/p95", 100),
+        ("e2e", "Cam→Key p50/p95", 110),
+        ("keys", "Key events", 70),
+        ("errors", "Errors", 50),
+    )
+
+    def __init__(self, window, pool):
+        import_ui()
+        self.window = window
+        self.pool = pool
+        self.window.title(
+            f"PhantomCast Stations ({len(pool.stations)} cameras,"
+            f" {len(pool.workers)} inference workers)"
+        )
+        self.tree = ttk.Treeview(
+            window,
+            columns=[c[0] for c in self.COLUMNS],
+            height=max(3, len(pool.stations)),
+        )
+        self.tree.heading("#0", text="Station")
+        self.tree.column("#0", width=120)
+        for key, title, width in self.COLUMNS:
+            self.tree.heading(key, text=title)
+            self.tree.column(key, width=width, anchor=tk.CENTER)
+        for st in pool.stations:
+            self.tree.insert("", tk.END, iid=str(st.index), text=st.name)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        self.btn_toggle = tk.Button(
+            window,
+            text="START OUTPUT",
+            bg="#27ae60",
+            fg="white",
+            font=("Arial", 12, "bold"),
+            command=self.toggle_output,
+            height=2,
+        )
+        self.btn_toggle.pack(fill=tk.X, padx=10, pady=10)
+
+        self.pool.start()
+        self.refresh()
+        self.window.protocol("WM_DELETE_WINDOW", self.on_closing)
+
+    def toggle_output(self):
+        self.pool.set_emit(not self.pool.emit)
+        self.btn_toggle.config(
+            text="STOP OUTPUT" if self.pool.emit else "START OUTPUT",
+            bg="#c0392b" if self.pool.emit else "#27ae60",
+        )
+
+    def refresh(self):
+        for index, _, values in self.pool.rows():
+            self.tree.item(str(index), values=values)
+        self.window.after(500, self.refresh)
+
+    def on_closing(self):
+        self.pool.stop()
+        self.window.destroy()
+
+
+# --- HEADLESS / BENCHMARK ---
+class RecordingKeyboard:
+    # Stand-in for pynput's Controller that only records what would be sent
+    def __init__(self):
+        self.events = []
+
+    def press(self, key):
+        self.events.append((time.perf_counter(), "press", key_name(key)))
+
+    def release(self, key):
+        self.events.append((time.perf_counter(), "release", key_name(key)))
+
+
+def open_source(source):
+    # Camera index ("0") or a video file path
+    return cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+
+
+def run_headless(source, settings, max_frames=0, mirror=True, recorder=None):
+    # capture -> MediaPipe -> gesture logic, without Tk and with key output
+    # going to a RecordingKeyboard. Returns (frames, seconds, stats, keyboard).
+    vid = open_source(source)
+    if not vid.isOpened():
+        raise RuntimeError(f"Cannot open video source {source!r}")
+    if str(source).isdigit():
+        configure_capture(vid, settings)
+    flip_frames = mirror and not settings.mirror_landmarks
+    pipeline = LandmarkPipeline(
+        "eye_gap" in settings.rules.features,
+        settings.parallel_detectors,
+        detector_backend_spec(settings),
+    )
+    keyboard = RecordingKeyboard()
+    gestures = GestureEngine(keyboard, settings)
+    scaler = InferenceScaler()
+    stats = LatencyStats()
+    frames = 0
+    start = time.perf_counter()
+    frame = flipped = None  # decoded and mirrored frames, reused
+    try:
+        while not max_frames or frames < max_frames:
+            t0 = time.perf_counter()
+            ret, frame = vid.read(frame)
+            if not ret:
+                break
+            image = frame
+            if flip_frames:
+                image = flipped = cv2.flip(frame, 1, dst=flipped)
+            t1 = time.perf_counter()
+            opts = pipeline_options(settings, scaler.scale)
+            out, timings = pipeline.run(image, t1, opts)
+            t3 = time.perf_counter()
+            scaler.update(timings["convert"] + timings["detect"], settings)
+            sides, hand_lms = out["hands"]
+            face_lms = out["face"]
+            if mirror and not flip_frames:
+                sides, hand_lms, face_lms = mirror_landmarks(sides, hand_lms, face_lms)
+            if recorder is not None:
+                recorder.write(t0, sides, hand_lms, face_lms)
+            gestures.apply(sides, hand_lms, face_lms, t0)
+            t4 = time.perf_counter()
+            for stage, ms in gestures.keys.take_samples():
+                stats.add(stage, ms)
+
+            stats.add("capture", (t1 - t0) * 1000)
+            for stage in ("convert", "hands", "face", "detect"):
+                if stage in timings:
+                    stats.add(stage, timings[stage])
+            stats.add("logic", (t4 - t3) * 1000)
+            stats.add("total", (t4 - t0) * 1000)
+            frames += 1
+    finally:
+        gestures.keys.close()
+        pipeline.close()
+        vid.release()
+    return frames, time.perf_counter() - start, stats, keyboard
+
+
+def run_stations(pool, max_frames=0):
+    # Headless StationPool run, until every station has processed max_frames
+    # frames or its source has ended (Ctrl+C stops early). -> seconds
+    pool.start()
+    pool.set_emit(True)
+    start = time.perf_counter()
+    try:
+        while True:
+            time.sleep(0.2)
+            if max_frames and all(st.processed >= max_frames for st in pool.stations):
+                break
+            done = ("finished", "no source", "worker died")
+            if all(st.status in done for st in pool.stations):
+                time.sleep(1.0)  # let frames still in flight come back
+                break
+    except KeyboardInterrupt:
+        pass
+    seconds = time.perf_counter() - start
+    pool.stop()
+    return seconds
+
+
+def synthetic_landmarks(count, seed=0):
+    # Random-walk hand and face landmarks that sweep through tilt, finger and
+    # mouth/eye states, for timing the gesture logic without any model
+    rng = np.random.default_rng(seed)
+    base = np.zeros((21, 3), np.float32)
+    base[:, 0] = np.linspace(0.4, 0.6, 21)
+    base[:, 1] = np.linspace(0.8, 0.4, 21)
+    face = np.zeros((len(FACE_POINTS), 3), np.float32)
+    face[:, 1] = (0.2, 0.8, 0.6, 0.62, 0.4, 0.42, 0.4, 0.42)
+    for i in range(count):
+        phase = i / 30.0
+        hands = np.repeat(base[None], 2, axis=0)
+        hands[:, 9, 0] += 0.2 * np.sin(phase + np.array([0.0, 1.5]))
+        hands[:, [8, 12, 16, 20], 1] += rng.normal(0, 0.08, (2, 4))
+        hands[:, 12, 0] += 0.05 + 0.05 * np.sin(phase * 0.7)
+        f = face.copy()
+        f[3, 1] += 0.15 * max(0.0, np.sin(phase * 0.3))
+        f[[5, 7], 1] -= 0.02 * (np.sin(phase * 0.9) > 0.9)
+        yield ("Left", "Right"), hands, f
+
+
+def run_synthetic(settings, count=10000, seed=0):
+    # Gesture logic only, fed from synthetic_landmarks. Keys are sent inline:
+    # at benchmark speed the output thread would coalesce most of them.
+    keyboard = RecordingKeyboard()
+    gestures = GestureEngine(keyboard, settings.replace(async_keys=False))
+    stats = LatencyStats()
+    stream = list(synthetic_landmarks(count, seed))
+    start = time.perf_counter()
+    for i, (sides, hands, face) in enumerate(stream):
+        t0 = time.perf_counter()
+        gestures.apply(sides, hands, face, i / 30.0)
+        stats.add("logic", (time.perf_counter() - t0) * 1000)
+    gestures.keys.close()
+    return count, time.perf_counter() - start, stats, keyboard
+
+
+def run_replay(path, settings):
+    # Feeds a LandmarkRecorder file straight into the gesture logic, with
+    # inline key output like run_synthetic
+    reader = LandmarkReader(path)
+    keyboard = RecordingKeyboard()
+    gestures = GestureEngine(keyboard, settings.replace(async_keys=False))
+    stats = LatencyStats()
+    start = time.perf_counter()
+    for ts, sides, hands, face in reader:
+        t0 = time.perf_counter()
+        gestures.apply(sides, hands, face, ts)
+        stats.add("logic", (time.perf_counter() - t0) * 1000)
+    gestures.keys.close()
+    return len(reader), time.perf_counter() - start, stats, keyboard
+
+
+def print_report(title, frames, seconds, stats, keyboard):
+    fps = frames / seconds if seconds else 0.0
+    print(f"== {title}: {frames} frames in {seconds:.2f} s ({fps:.1f} frames/s)")
+    print(stats.table())
+    presses = sum(1 for _, kind, _ in keyboard.events if kind == "press")
+    print(f"key events: {len(keyboard.events)} ({presses} presses)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="PhantomCast gesture control")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="run the pipeline without the window and print throughput",
+    )
+    parser.add_argument(
+        "--source", default="0", help="camera index or video file (headless)"
+    )
+    parser.add_argument(
+        "--settings", default=SETTINGS_FILE, help="settings file (headless)"
+    )
+    parser.add_argument(
+        "--max-frames", type=int, default=0, help="stop after N frames (headless)"
+    )
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        help="write per-frame landmarks to PATH (overwrites it)",
+    )
+    parser.add_argument(
+        "--stations",
+        metavar="PATH",
+        help="run every camera listed in a stations file from one process pool",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="inference processes for --stations (default: one per core)",
+    )
+    parser.add_argument(
+        "--listen",
+        metavar="ADDRESS",
+        help="print the messages of a running instance's event bus",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="run the gesture logic over a landmark recording and exit",
+    )
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    root = tk.Tk()
-    root.geometry("640x640")
-    app = GestureApp(root, "PhantomCast v1.0")
-    root.mainloop()
+    multiprocessing.freeze_support()
+    args = parse_args()
+    if args.listen:
+        try:
+            listen_bus(args.listen)
+        except KeyboardInterrupt:
+            pass
+    elif args.replay:
+        print_report(
+            args.replay, *run_replay(args.replay, Settings.load(args.settings))
+        )
+    elif args.stations and args.headless:
+        stations = read_station_list(args.stations, RecordingKeyboard)
+        pool = StationPool(stations, args.workers)
+        seconds = run_stations(pool, args.max_frames)
+        for st in pool.stations:
+            print_report(
+                f"{st.name} ({st.source})",
+                st.processed,
+                seconds,
+                st.latency,
+                st.gestures.keys.keyboard,
+            )
+    elif args.stations:
+        import_ui()
+        root = tk.Tk()
+        pool = StationPool(read_station_list(args.stations), args.workers)
+        StationSupervisor(root, pool)
+        root.mainloop()
+    elif args.headless:
+        recorder = LandmarkRecorder(args.record) if args.record else None
+        try:
+            result = run_headless(
+                args.source,
+                Settings.load(args.settings),
+                args.max_frames,
+                recorder=recorder,
+            )
+        finally:
+            if recorder is not None:
+                recorder.close()
+        print_report(args.source, *result)
+    else:
+        import_ui()
+        root = tk.Tk()
+        root.geometry("640x640")
+        app = GestureApp(root, "PhantomCast v1.0", record_path=args.record)
+        root.mainloop()
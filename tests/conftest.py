@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests run on main's stand-in keys whatever keyboard backend the machine
+# has; a None entry makes "from pynput.keyboard import Key" fail
+sys.modules.setdefault("pynput.keyboard", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
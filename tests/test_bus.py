@@ -0,0 +1,51 @@
+import json
+import queue
+import socket
+import threading
+
+import pytest
+
+import main
+
+
+def test_bus_tcp_is_loopback_only():
+    local = (socket.AF_INET, ("127.0.0.1", 8765))
+    assert main.bus_address("8765") == local
+    assert main.bus_address("localhost:8765") == local
+    assert main.bus_address("127.0.0.1:8765") == local
+    for value in ("0.0.0.0:8765", "192.168.1.5:8765", "example.com:8765"):
+        with pytest.raises(ValueError):
+            main.bus_address(value)
+
+
+def test_publish_counts_drops_per_full_subscriber(tmp_path):
+    bus = main.EventBus(str(tmp_path / "bus.sock"))
+    pairs = [socket.socketpair() for _ in range(3)]
+    try:
+        # Subscribers without sender threads: each queue takes one message
+        queues = [queue.Queue(maxsize=1) for _ in pairs]
+        with bus.lock:
+            for (conn, _), jobs in zip(pairs, queues):
+                bus.subscribers[conn] = jobs
+        workers = [
+            threading.Thread(
+                target=lambda: [bus.publish({"t": "x"}) for _ in range(50)]
+            )
+            for _ in range(4)
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        total = 4 * 50
+        assert bus.sent == total
+        assert bus.dropped == len(pairs) * (total - 1)
+        assert bus.summary() == f"3 subs / {total} sent / {3 * (total - 1)} drop"
+        # each subscriber kept the first message and dropped the rest
+        assert [json.loads(q.get_nowait())["n"] for q in queues] == [0, 0, 0]
+    finally:
+        bus.close()
+        for a, b in pairs:
+            a.close()
+            b.close()
+    assert not (tmp_path / "bus.sock").exists()
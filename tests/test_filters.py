@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+import main
+
+
+def test_one_euro_smooths_jitter_and_follows_motion():
+    rng = np.random.default_rng(0)
+    noisy = main.OneEuroFilter(min_cutoff=1.0, beta=0.0)
+    out = [noisy.update(10 + rng.normal(0, 1), i / 30) for i in range(300)]
+    assert np.std(out[30:]) < 0.5
+
+    ramp = main.OneEuroFilter(min_cutoff=1.0, beta=1.0)
+    for i in range(60):
+        ramp.update(i / 3, i / 30)  # 10 units per second
+    assert abs(ramp.x - 59 / 3) < 1.0
+    assert abs(ramp.dx - 10) < 0.5
+    assert ramp.predict(3.0) - ramp.x == pytest.approx(ramp.dx * 0.1)  # capped horizon
+
+
+def hand(tilt, gap, side="Left"):
+    return main.HandFeatures(side, tilt, None, 0, gap, False)
+
+
+def frame(*hands):
+    return main.FrameFeatures(hands, None, None, False)
+
+
+def test_feature_filter_predicts_held_results():
+    filt = main.FeatureFilter()
+    for i in range(30):
+        filt.apply(frame(hand(i * 1.0, 0.1)), i / 30, False, True)
+    # the same values again: a held detector result, extrapolated
+    held = filt.apply(frame(hand(29.0, 0.1)), 1.0 + 1 / 30, False, True)
+    assert held.hands[0].tilt > 29.5
+    unpredicted = filt.apply(frame(hand(29.0, 0.1)), 1.1, False, False)
+    assert unpredicted.hands[0].tilt == 29.0
+
+
+def test_feature_filter_forgets_hands_that_left():
+    filt = main.FeatureFilter()
+    filt.apply(frame(hand(10.0, 0.1)), 0.0, True, False)
+    filt.apply(frame(), 0.1, True, False)
+    back = filt.apply(frame(hand(80.0, 0.1)), 0.2, True, False)
+    assert back.hands[0].tilt == 80.0  # not smoothed towards the old tilt
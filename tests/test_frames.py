@@ -0,0 +1,48 @@
+import numpy as np
+
+import main
+
+
+def test_pool_reuses_frame_after_last_release():
+    pool = main.FramePool()
+    assert pool.acquire() is None  # size not known yet
+    frame = pool.acquire((4, 6, 3))
+    pool.hold(frame)
+    pool.release(frame)
+    assert pool.acquire() is not frame  # still held once
+    pool.release(frame)
+    assert pool.acquire() is frame
+    assert pool.allocated == 2
+
+
+def test_pool_drops_frames_of_old_size():
+    pool = main.FramePool()
+    frame = pool.acquire((4, 6, 3))
+    pool.release(frame)
+    other = pool.acquire((8, 6, 3))
+    assert other is not frame and other.shape == (8, 6, 3)
+    pool.release(np.zeros((4, 6, 3), np.uint8))  # not from the pool: ignored
+    assert pool.free == []
+
+
+def test_pool_adopts_decoder_frame():
+    pool = main.FramePool()
+    buf = pool.acquire((4, 6, 3))
+    decoded = np.zeros((5, 6, 3), np.uint8)
+    assert pool.adopt(decoded, buf) is decoded
+    assert pool.shape == (5, 6, 3)
+    pool.release(decoded)
+    assert pool.acquire() is decoded
+
+
+def test_exchange_releases_replaced_frames():
+    pool = main.FramePool()
+    exchange = main.FrameExchange(pool)
+    first = pool.acquire((2, 2, 3))
+    exchange.publish(first, 1.0)
+    seen, seq, ts = exchange.latest(hold=True)
+    assert (seen, seq, ts) == (first, 1, 1.0)
+    exchange.publish(pool.acquire(), 2.0)
+    assert pool.free == []  # the reader still holds the first frame
+    exchange.release(seen)
+    assert [id(f) for f in pool.free] == [id(first)]
@@ -0,0 +1,110 @@
+import enum
+import sys
+import types
+
+import pytest
+
+import main
+
+
+def names(keyboard):
+    return [(action, key) for _, action, key in keyboard.events]
+
+
+def test_compile_binding():
+    keys = main.key_names()
+    assert main.compile_binding("") == ()
+    assert main.compile_binding("ctrl+tab, E") == (
+        (keys["ctrl"], keys["tab"]),
+        ("e",),
+    )
+    assert main.compile_binding("capslock") == ((keys["caps_lock"],),)
+
+
+@pytest.mark.parametrize("text", ["ctrl+", "nosuchkey", "a,,b"])
+def test_compile_binding_rejects(text):
+    with pytest.raises(ValueError):
+        main.compile_binding(text)
+
+
+def test_platform_keys_replace_stand_ins(monkeypatch):
+    # A key the platform's Key lacks is refused, not sent as a stand-in
+    Key = enum.Enum("Key", "ctrl tab caps_lock")
+    monkeypatch.setitem(sys.modules, "pynput.keyboard", types.SimpleNamespace(Key=Key))
+    monkeypatch.setattr(main, "KEY_NAMES", {})
+    assert main.compile_binding("ctrl+capslock") == ((Key.ctrl, Key.caps_lock),)
+    with pytest.raises(ValueError):
+        main.compile_binding("insert")
+
+
+def test_reconciler_sends_only_transitions():
+    keyboard = main.RecordingKeyboard()
+    keys = main.KeyReconciler(keyboard)
+    keys.sync(["w", "a"], considered=["w", "a", "d"])
+    keys.sync(["w", "a"], considered=["w", "a", "d"])
+    keys.sync(["a", "d"], considered=["w", "a", "d"])
+    keys.release_held()
+    assert names(keyboard) == [
+        ("press", "W"),
+        ("press", "A"),
+        ("release", "W"),
+        ("press", "D"),
+        ("release", "D"),
+        ("release", "A"),
+    ]
+    assert (keys.emitted, keys.suppressed) == (6, 5)
+
+
+def test_reconciler_tap_skips_held_keys():
+    keyboard = main.RecordingKeyboard()
+    keys = main.KeyReconciler(keyboard)
+    ctrl = main.key_names()["ctrl"]
+    keys.sync([ctrl])
+    keys.tap((ctrl, "c"))
+    assert names(keyboard) == [
+        ("press", "CTRL"),
+        ("press", "C"),
+        ("release", "C"),
+    ]
+    assert keys.active_keys == ["CTRL"]
+
+
+def test_reconciler_thread_keeps_order():
+    keyboard = main.RecordingKeyboard()
+    keys = main.KeyReconciler(keyboard)
+    keys.use_thread(True)
+    for _ in range(50):
+        keys.tap(("r",))
+        keys.sync(["w"])
+        keys.sync([])
+    emitter = keys.emitter
+    keys.close()
+    sent = names(keyboard)
+    # coalescing may only drop release/press pairs of held keys
+    assert sent.count(("press", "R")) == 50
+    assert sent.count(("release", "R")) == 50
+    assert sent.count(("press", "W")) == sent.count(("release", "W")) >= 1
+    assert len(sent) + emitter.coalesced == keys.emitted
+
+
+def test_coalesce_keeps_two_taps_in_one_batch():
+    taps = [(True, "r"), (False, "r"), (True, "r"), (False, "r")]
+    assert main.coalesce_key_events([taps]) == (taps, 0)
+
+
+def test_coalesce_keeps_taps_across_batches():
+    tap = [(True, "c"), (True, "t"), (False, "t"), (False, "c")]
+    assert main.coalesce_key_events([tap, tap]) == (tap + tap, 0)
+
+
+def test_coalesce_drops_release_press_of_held_key():
+    batches = [[(True, "w")], [(False, "w")], [(True, "w")]]
+    assert main.coalesce_key_events(batches) == ([(True, "w")], 2)
+    # held since before the backlog
+    assert main.coalesce_key_events([[(False, "w")], [(True, "w")]]) == ([], 2)
+
+
+def test_coalesce_keeps_tap_after_released_hold():
+    batches = [[(False, "w")], [(True, "w"), (False, "w")]]
+    events = [(False, "w"), (True, "w"), (False, "w")]
+    assert main.coalesce_key_events(batches) == (events, 0)
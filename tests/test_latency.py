@@ -0,0 +1,38 @@
+import main
+
+
+def stats():
+    stats = main.LatencyStats()
+    for ms in range(1, 101):
+        stats.add("detect", float(ms))
+    stats.add("logic", 0.5)
+    return stats
+
+
+def test_csv_export_appends_rows_under_one_header(tmp_path):
+    path = tmp_path / "latency.csv"
+    exporter = main.LatencyExporter(str(path), interval=0.0)
+    assert exporter.maybe_write(stats())
+    assert exporter.maybe_write(stats())
+    lines = path.read_text().splitlines()
+    assert lines[0] == "time,stage,count,p50_ms,p95_ms,p99_ms"
+    assert len(lines) == 5
+    assert lines[1].split(",")[1:4] == ["detect", "100", "50.500"]
+
+
+def test_prometheus_export_is_rewritten(tmp_path):
+    path = tmp_path / "latency.prom"
+    exporter = main.LatencyExporter(str(path), interval=0.0)
+    exporter.maybe_write(stats())
+    exporter.maybe_write(stats())
+    text = path.read_text()
+    assert text.count("# TYPE phantomcast_latency_ms summary") == 1
+    assert 'phantomcast_latency_ms_count{stage="detect"} 100' in text
+    assert 'phantomcast_latency_ms{stage="logic",quantile="0.5"} 0.500' in text
+    assert not (tmp_path / "latency.prom.tmp").exists()
+
+
+def test_export_waits_for_interval(tmp_path):
+    exporter = main.LatencyExporter(str(tmp_path / "latency.csv"), interval=60.0)
+    assert not exporter.maybe_write(stats())
+    assert not (tmp_path / "latency.csv").exists()
@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+import main
+
+
+class FakeMesh:
+    # FaceMesh stand-in that finds a face filling the middle of any image
+    def __init__(self):
+        self.images = []
+
+    def process(self, rgb):
+        self.images.append(rgb)
+        n = max(main.FACE_POINTS + main.FACE_OUTLINE_POINTS) + 1
+        xy = np.linspace(0.25, 0.75, n)
+        marks = [SimpleNamespace(x=x, y=x, z=0.0) for x in xy]
+        return SimpleNamespace(multi_face_landmarks=[SimpleNamespace(landmark=marks)])
+
+
+def test_face_crop_reuses_one_buffer():
+    mesh = FakeMesh()
+    tracker = main.FaceRoiTracker(mesh)
+    rgb = np.zeros((240, 320, 3), np.uint8)
+    for _ in range(4):
+        tracker.process(rgb)
+    crops = mesh.images[1:]
+    assert tracker.crop_runs == 3
+    assert all(c.flags.c_contiguous and c.shape != rgb.shape for c in crops)
+    assert len({c.__array_interface__["data"][0] for c in crops}) == 1
+
+
+def test_scaler_steps_down_over_budget_and_back_up():
+    cfg = main.Settings.from_dict({"inference_auto": True, "latency_budget_ms": 20})
+    scaler = main.InferenceScaler(patience=5)
+    for _ in range(5):
+        scaler.update(40.0, cfg)
+    assert scaler.scale == 0.75
+    for _ in range(9):
+        scaler.update(5.0, cfg)
+    assert scaler.scale == 0.75  # waits 2 * patience before growing
+    scaler.update(5.0, cfg)
+    assert scaler.scale == 1.0
+    manual = cfg.replace(inference_auto=False, inference_scale=0.1)
+    assert scaler.update(40.0, manual) == main.InferenceScaler.STEPS[-1]
+
+
+def test_face_crop_landmarks_map_to_full_frame():
+    tracker = main.FaceRoiTracker(FakeMesh())
+    tracker.enabled = False
+    n = max(main.FACE_POINTS + main.FACE_OUTLINE_POINTS) + 1
+    marks = [SimpleNamespace(x=0.5, y=0.25, z=0.1)] * n
+    res = SimpleNamespace(multi_face_landmarks=[SimpleNamespace(landmark=marks)])
+    pts = tracker._track(res, 640, 480, (100, 40, 200, 160))
+    assert pts.shape == (len(main.FACE_POINTS), 3)
+    np.testing.assert_allclose(
+        pts[0], [(100 + 100) / 640, (40 + 40) / 480, 0.1 * 200 / 640], rtol=1e-6
+    )
+
+
+class FakeExecutor:
+    # DetectorExecutor stand-in that records which detectors ran
+    def __init__(self):
+        self.models = {"hands": None, "face": None}
+        self.calls = []
+
+    def run(self, rgb, names=None):
+        self.calls.append(tuple(names))
+        return {name: f"{name} {len(self.calls)}" for name in names}
+
+
+def test_scheduler_staggers_detectors_with_one_interval():
+    executor = FakeExecutor()
+    scheduler = main.DetectorScheduler(executor)
+    for _ in range(5):
+        out, ran = scheduler.run(None, {"hands": 2, "face": 2})
+    assert executor.calls == [
+        ("hands", "face"),
+        ("face",),
+        ("hands",),
+        ("face",),
+        ("hands",),
+    ]
+    assert out == {"hands": "hands 5", "face": "face 4"}  # held between runs
+    out, ran = scheduler.run(None, {"hands": 1})
+    assert ran == ["hands"] and out["face"] is main.NO_DETECTION["face"]
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import main
+
+
+def test_recorder_reader_round_trip(tmp_path):
+    path = tmp_path / "session.pcrec"
+    rng = np.random.default_rng(1)
+    hands = rng.random((2, 21, 3), dtype=np.float32)
+    face = rng.random((len(main.FACE_POINTS), 3), dtype=np.float32)
+    recorder = main.LandmarkRecorder(str(path))
+    recorder.write(1.5, ("Left", "Right"), hands, face)
+    recorder.write(2.0, ("Right",), hands[:1], None)
+    recorder.write(2.5, (), hands[:0], None)
+    recorder.close()
+    recorder.write(3.0, (), hands[:0], None)  # ignored after close
+
+    reader = main.LandmarkReader(str(path))
+    rows = list(reader)
+    assert len(reader) == len(rows) == 3
+    ts, sides, got_hands, got_face = rows[0]
+    assert (ts, sides) == (1.5, ("Left", "Right"))
+    np.testing.assert_array_equal(got_hands, hands)
+    np.testing.assert_array_equal(got_face, face)
+    ts, sides, got_hands, got_face = rows[1]
+    assert (ts, sides, got_face) == (2.0, ("Right",), None)
+    np.testing.assert_array_equal(got_hands, hands[:1])
+    assert rows[2][1] == () and rows[2][2].shape == (0, 21, 3)
+
+
+def test_reader_ignores_partial_row(tmp_path):
+    path = tmp_path / "session.pcrec"
+    recorder = main.LandmarkRecorder(str(path))
+    recorder.write(1.0, (), np.zeros((0, 21, 3), np.float32), None)
+    recorder.close()
+    with open(path, "ab") as f:
+        f.write(b"\0" * 10)
+    assert len(main.LandmarkReader(str(path))) == 1
+
+
+def test_reader_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a recording")
+    with pytest.raises(ValueError):
+        main.LandmarkReader(str(path))
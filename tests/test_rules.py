@@ -0,0 +1,124 @@
+import hashlib
+
+import numpy as np
+
+import main
+
+
+def compile_one(spec):
+    values = dict(main.DEFAULT_SETTINGS)
+    return main.compile_rules([spec], values, {})
+
+
+def test_default_rules_compile():
+    settings = main.Settings.from_dict({})
+    assert settings.rules.errors == ()
+    assert {g.name for g in settings.rules.groups} >= {"mouth", "eye"}
+
+
+def test_broken_rules_are_reported_and_skipped():
+    plan = main.compile_rules(
+        [
+            {"name": "a", "feature": "nope", "op": ">", "binding": "x"},
+            {"name": "b", "feature": "mouth_ratio", "op": "~", "binding": "x"},
+            {"name": "c", "feature": "mouth_ratio", "op": ">", "action": "spin"},
+            {"name": "d", "feature": "tilt", "op": ">", "binding": "x"},
+            {"name": "e", "feature": "mouth_ratio", "op": ">", "threshold": "nope"},
+            {"name": "f", "feature": "mouth_ratio", "op": ">", "binding": "nokey"},
+            {"name": "g", "feature": "mouth_ratio", "op": ">", "binding": "x"},
+            {
+                "name": "h",
+                "group": "g",
+                "feature": "mouth_ratio",
+                "op": ">",
+                "action": "latch",
+                "binding": "y",
+            },
+        ],
+        dict(main.DEFAULT_SETTINGS),
+        {},
+    )
+    assert [e.split(":")[0] for e in plan.errors] == [
+        "rule a",
+        "rule b",
+        "rule c",
+        "rule d",
+        "rule e",
+        "rule f",
+        "rule h",
+    ]
+    assert [g.name for g in plan.groups] == ["g"]
+    assert plan.detectors == ("face",)
+
+
+def test_unbound_groups_are_dropped():
+    plan = compile_one({"name": "m", "feature": "mouth_ratio", "op": ">"})
+    assert plan.errors == () and plan.groups == ()
+    assert plan.features == frozenset() and plan.detectors == ()
+
+
+def test_synthetic_key_stream_is_pinned():
+    # The repo's settings file with the default rules; same stream as the
+    # hand-written gesture logic produced before the rule table
+    settings = main.Settings.load(main.SETTINGS_FILE)
+    frames, _, _, keyboard = main.run_synthetic(settings, count=3000)
+    text = "\n".join(f"{action} {key}" for _, action, key in keyboard.events)
+    assert len(keyboard.events) == 3497
+    assert hashlib.sha256(text.encode()).hexdigest() == (
+        "d74d362588fd72014fa140acf8e047879c58f8297e485bd1002141d2dd6a14dd"
+    )
+
+
+def test_rules_with_wrong_types_are_reported():
+    base = {"feature": "mouth_ratio", "op": ">", "binding": "x"}
+    plan = main.compile_rules(
+        [
+            dict(base, name="a", binding=123),
+            dict(base, name=["x"]),
+            dict(base, name="c", group={"g": 1}),
+            dict(base, name="d", when=[5]),
+            dict(base, name="e", hand=["Left"]),
+            dict(base, name="f", show=5),
+            dict(base, name="g", show="{foo}"),
+            dict(base, name="h", show="{value:q}"),
+            dict(base, name="i", show="{}"),
+            dict(base, name="j", hud=["M"]),
+            dict(base, name="k", hud="M", idle=0),
+        ],
+        dict(main.DEFAULT_SETTINGS),
+        {},
+    )
+    assert len(plan.errors) == 11
+    assert plan.errors[0] == "rule a: binding must be a string, not 123"
+    assert plan.errors[1] == "rule ['x']: name must be a string, not ['x']"
+    assert plan.errors[6] == ("rule g: show can use {value} and {int}, not {foo}")
+    assert plan.groups == ()
+
+
+def test_show_placeholders_compile():
+    spec = {"name": "m", "feature": "mouth_ratio", "op": ">", "binding": "x"}
+    plan = main.compile_rules(
+        [dict(spec, show="OPEN {value:.2f} ({int}%)", hud="Mouth", idle=None)],
+        dict(main.DEFAULT_SETTINGS),
+        {},
+    )
+    assert plan.errors == ()
+    assert plan.groups[0].idle == ""
+
+
+def test_engine_uses_one_settings_snapshot_per_frame(monkeypatch):
+    # An edit that binds a face group lands between feature extraction and
+    # rule evaluation; this frame must still use the rules it extracted for
+    unbound = main.Settings.from_dict({"key_mouth": "", "key_eye": ""})
+    engine = main.GestureEngine(main.RecordingKeyboard(), unbound)
+    extract = main.extract_features
+
+    def extract_then_edit(*args):
+        feats = extract(*args)
+        engine.settings = main.Settings.from_dict({"key_mouth": "m"})
+        return feats
+
+    monkeypatch.setattr(main, "extract_features", extract_then_edit)
+    face = np.zeros((len(main.FACE_POINTS), 3), np.float32)
+    engine.apply((), np.zeros((0, 21, 3), np.float32), face, 0.0)
+    engine.keys.close()